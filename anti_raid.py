@@ -0,0 +1,263 @@
+import sys
+import time
+from collections import deque
+
+# Approximate size of one (timestamp, user_id) entry: the tuple, the float and a snowflake int
+EVENT_BYTES = sys.getsizeof((0.0, 0)) + sys.getsizeof(0.0) + sys.getsizeof(2 ** 60)
+
+
+class SlidingWindow:
+    """
+    The events of the last timeframe seconds, with a count per user.
+
+    Events arrive in time order, so the oldest are always at the left of the
+    deque: expiring pops from there and decrements the user's count, and
+    adding appends and increments it. Both are amortized O(1), and so is
+    asking how many events there are in total or from one user.
+    """
+
+    __slots__ = ("timeframe", "events", "counts")
+
+    def __init__(self, timeframe):
+        self.timeframe = timeframe
+        # (timestamp, user_id), oldest first
+        self.events = deque()
+        # {user_id: events in the window}
+        self.counts = {}
+
+    def _pop_oldest(self):
+        _, user_id = self.events.popleft()
+        remaining = self.counts[user_id] - 1
+        if remaining:
+            self.counts[user_id] = remaining
+        else:
+            del self.counts[user_id]
+
+    def expire(self, now):
+        """Drop the events older than the window; returns how many were dropped"""
+        events = self.events
+        cutoff = now - self.timeframe
+        dropped = 0
+        while events and events[0][0] <= cutoff:
+            self._pop_oldest()
+            dropped += 1
+        return dropped
+
+    def drop_oldest(self, count):
+        """Drop up to count of the oldest events; returns how many were dropped"""
+        count = min(count, len(self.events))
+        for _ in range(count):
+            self._pop_oldest()
+        return count
+
+    def add(self, user_id, now):
+        """Add an event; returns how many expired events were dropped first"""
+        dropped = self.expire(now)
+        self.events.append((now, user_id))
+        self.counts[user_id] = self.counts.get(user_id, 0) + 1
+        return dropped
+
+    def size_bytes(self):
+        return sys.getsizeof(self.events) + sys.getsizeof(self.counts) + len(self.events) * EVENT_BYTES
+
+    def count(self, user_id):
+        return self.counts.get(user_id, 0)
+
+    def __len__(self):
+        return len(self.events)
+
+
+# Anti-raid system
+# Tracks recent actions to detect raid attempts
+class AntiRaidSystem:
+    # How often windows that saw no new events are trimmed and dropped (in seconds)
+    SWEEP_INTERVAL = 60
+    # Most events kept per guild across all its windows; past it the oldest are dropped
+    MAX_GUILD_EVENTS = 20000
+
+    def __init__(self, clock=time.monotonic, sweep_interval=SWEEP_INTERVAL, max_guild_events=MAX_GUILD_EVENTS):
+        # Seconds on a clock that never jumps (wall-clock changes don't stretch or shrink the windows)
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self.max_guild_events = max_guild_events
+        self._next_sweep = clock() + sweep_interval
+
+        # Events per guild across its windows: {server_id: count}
+        self.guild_events = {}
+        self.sweeps = 0
+        self.windows_evicted = 0
+        self.guilds_evicted = 0
+        self.events_capped = 0
+
+        # Store recent joins: {server_id: SlidingWindow of (join_time, member_id)}
+        self.recent_joins = {}
+
+        # Store recent actions: {server_id: {action_type: SlidingWindow of (timestamp, user_id)}}
+        self.recent_actions = {}
+
+        # Raid detection thresholds
+        self.join_threshold = 5  # Number of joins in short period to trigger alert
+        self.join_timeframe = 10  # Timeframe in seconds to monitor joins
+
+        # Message spam thresholds
+        self.message_threshold = 8  # Messages from same user in timeframe
+        self.message_timeframe = 5  # Timeframe in seconds
+
+        # Channel creation/deletion thresholds
+        self.channel_action_threshold = 3  # Number of channel creations/deletions
+        self.channel_action_timeframe = 20  # In seconds
+
+        # Role action thresholds
+        self.role_action_threshold = 3  # Number of role creations/deletions
+        self.role_action_timeframe = 30  # In seconds
+
+        # Permissions threshold
+        self.permission_changes_threshold = 5  # Number of permission changes
+        self.permission_timeframe = 15  # In seconds
+
+        # Ban/kick threshold
+        self.ban_kick_threshold = 4  # Number of bans/kicks
+        self.ban_kick_timeframe = 10  # In seconds
+
+        # Raid status
+        self.raid_mode = {}  # {server_id: bool}
+
+    def add_join(self, server_id, member_id):
+        """Add a member join event to tracking"""
+        window = self.recent_joins.get(server_id)
+        if window is None:
+            window = self.recent_joins[server_id] = SlidingWindow(self.join_timeframe)
+        else:
+            window.timeframe = self.join_timeframe
+
+        # Add the new join (old entries are dropped as it is added)
+        now = self.clock()
+        self._added(server_id, window, window.add(member_id, now), now)
+
+        # Check if raid threshold is met
+        return len(window) >= self.join_threshold
+
+    def limits(self, action_type):
+        """Return (timeframe, threshold) for an action type"""
+        if action_type == 'message':
+            return self.message_timeframe, self.message_threshold
+        elif action_type in ('channel_create', 'channel_delete'):
+            return self.channel_action_timeframe, self.channel_action_threshold
+        elif action_type in ('role_create', 'role_delete', 'role_update'):
+            return self.role_action_timeframe, self.role_action_threshold
+        elif action_type in ('ban', 'kick'):
+            return self.ban_kick_timeframe, self.ban_kick_threshold
+        elif action_type == 'permission_update':
+            return self.permission_timeframe, self.permission_changes_threshold
+        return 30, 10  # Default timeframe and threshold
+
+    def add_action(self, server_id, action_type, user_id):
+        """Add an action event to tracking and check thresholds"""
+        actions = self.recent_actions.get(server_id)
+        if actions is None:
+            actions = self.recent_actions[server_id] = {}
+
+        timeframe, threshold = self.limits(action_type)
+        window = actions.get(action_type)
+        if window is None:
+            window = actions[action_type] = SlidingWindow(timeframe)
+        else:
+            # Follow threshold changes made at runtime
+            window.timeframe = timeframe
+
+        # Add the action (old entries are dropped as it is added)
+        now = self.clock()
+        self._added(server_id, window, window.add(user_id, now), now)
+
+        # Check if user-specific threshold is met (for message spam)
+        if action_type == 'message':
+            return window.count(user_id) >= threshold
+
+        # Check if general threshold is met
+        return len(window) >= threshold
+
+    def _added(self, server_id, window, expired, now):
+        """Account for an event added to one of a guild's windows and enforce the guild's cap"""
+        total = self.guild_events.get(server_id, 0) + 1 - expired
+        if total > self.max_guild_events:
+            # Keep the newest event so the current check still sees it
+            capped = window.drop_oldest(min(total - self.max_guild_events, len(window) - 1))
+            total -= capped
+            self.events_capped += capped
+        self.guild_events[server_id] = total
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+    def _guild_windows(self, server_id):
+        windows = list(self.recent_actions.get(server_id, {}).values())
+        if server_id in self.recent_joins:
+            windows.append(self.recent_joins[server_id])
+        return windows
+
+    def sweep(self, now=None):
+        """
+        Expire every window, drop the empty ones and forget guilds with nothing left.
+        Runs on its own every sweep_interval seconds as events come in.
+        """
+        if now is None:
+            now = self.clock()
+        self._next_sweep = now + self.sweep_interval
+        self.sweeps += 1
+        for server_id, window in list(self.recent_joins.items()):
+            window.expire(now)
+            if not window:
+                del self.recent_joins[server_id]
+                self.windows_evicted += 1
+        for server_id, actions in list(self.recent_actions.items()):
+            for action_type, window in list(actions.items()):
+                window.expire(now)
+                if not window:
+                    del actions[action_type]
+                    self.windows_evicted += 1
+            if not actions:
+                del self.recent_actions[server_id]
+        for server_id in list(self.guild_events):
+            total = sum(len(window) for window in self._guild_windows(server_id))
+            if total:
+                self.guild_events[server_id] = total
+            else:
+                del self.guild_events[server_id]
+                self.guilds_evicted += 1
+
+    def guild_usage(self, server_id):
+        """Return [(window name, events, users, approximate bytes)] for a guild's windows"""
+        usage = []
+        if server_id in self.recent_joins:
+            window = self.recent_joins[server_id]
+            usage.append(("join", len(window), len(window.counts), window.size_bytes()))
+        for action_type, window in self.recent_actions.get(server_id, {}).items():
+            usage.append((action_type, len(window), len(window.counts), window.size_bytes()))
+        return usage
+
+    def stats(self):
+        """Counts of what is tracked across all guilds and its approximate size in bytes"""
+        windows = list(self.recent_joins.values())
+        for actions in self.recent_actions.values():
+            windows.extend(actions.values())
+        return {
+            "guilds": len(self.guild_events),
+            "windows": len(windows),
+            "events": sum(len(window) for window in windows),
+            "bytes": sum(window.size_bytes() for window in windows) + sys.getsizeof(self.guild_events)
+                     + sys.getsizeof(self.recent_joins) + sys.getsizeof(self.recent_actions)
+                     + sys.getsizeof(self.raid_mode),
+            "raid_mode": len(self.raid_mode),
+        }
+
+    def enable_raid_mode(self, server_id):
+        """Enable raid mode for a server"""
+        self.raid_mode[server_id] = True
+
+    def disable_raid_mode(self, server_id):
+        """Disable raid mode for a server"""
+        # Servers without an entry aren't in raid mode, so there's nothing to keep
+        self.raid_mode.pop(server_id, None)
+
+    def is_raid_mode_enabled(self, server_id):
+        """Check if raid mode is enabled for a server"""
+        return self.raid_mode.get(server_id, False)
@@ -0,0 +1,127 @@
+"""
+Adversarial benchmark for the automaton profanity engine.
+
+Builds inputs up to Discord's 4000 character limit that are known to make the
+per-word regex patterns backtrack (long runs of letters and separators, word
+prefixes that almost match, lookalike soup) plus random fuzz, and checks that
+no single call on the automaton engine takes longer than its budget. Each
+input is checked with a cold state cache, which is the slowest case.
+contains_profanity runs on every message, so it gets the tightest budget;
+find_matches and censor_text track match offsets and only run on demand.
+
+Exits with status 1 if any input goes over the budget.
+
+Usage: python benchmarks/bench_adversarial.py [fuzz_count] [--regex]
+    --regex also times the regex engine on short versions of the worst inputs
+"""
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profanity_filter import CHARACTER_CLASSES, SEPARATOR_CHARS, ProfanityFilter
+
+# Longest message Discord accepts (with Nitro)
+MAX_MESSAGE_LENGTH = 4000
+
+# Budget per call in milliseconds
+BUDGETS_MS = {
+    "contains_profanity": 25,
+    "find_matches": 100,
+    "censor_text": 100,
+}
+
+
+def fit(unit, length=MAX_MESSAGE_LENGTH):
+    """Repeat a unit until it fills the given length"""
+    return (unit * (length // max(len(unit), 1) + 1))[:length]
+
+
+def adversarial_inputs(profanity_filter):
+    """Yield (name, text) pairs built to stress backtracking matchers"""
+    words = profanity_filter.profanity_words + profanity_filter.harassment_words
+    separators = SEPARATOR_CHARS + " "
+
+    for letter, chars in CHARACTER_CLASSES.items():
+        yield f"run of {letter!r}", fit(letter)
+        yield f"{letter!r} and separators", fit(letter + " *")
+        yield f"lookalikes of {letter!r}", fit(chars)
+
+    for separator in separators:
+        yield f"p then {separator!r}", "p" + fit(separator, MAX_MESSAGE_LENGTH - 1)
+        yield f"n then {separator!r}", "n" + fit(separator + "!", MAX_MESSAGE_LENGTH - 1)
+
+    for word in words:
+        prefix = word[:-1] or word
+        yield f"prefix of {word!r}", fit(prefix + " ")
+        spaced = "*".join(prefix)
+        yield f"spaced prefix of {word!r}", fit(spaced + ". ")
+        yield f"stretched {word!r}", fit("".join(char * 5 + "-" for char in word))
+
+
+def fuzz_inputs(count, seed=99):
+    """Yield random texts made of letters, lookalikes and separators"""
+    rng = random.Random(seed)
+    alphabet = "".join(CHARACTER_CLASSES.values()) + SEPARATOR_CHARS + " !?,:/"
+    for index in range(count):
+        length = rng.choice([100, 1000, 2000, MAX_MESSAGE_LENGTH])
+        pool = rng.sample(alphabet, rng.randint(2, 8))
+        yield f"fuzz #{index}", "".join(rng.choice(pool) for _ in range(length))
+
+
+def time_call(function, text):
+    """Return how long one call takes, in milliseconds"""
+    # Collect garbage left by earlier calls so it isn't billed to this one
+    gc.collect()
+    start = time.perf_counter()
+    function(text)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    fuzz_count = int(args[0]) if args else 200
+
+    profanity_filter = ProfanityFilter(engine="automaton")
+    matcher = profanity_filter.matcher
+    checks = {
+        "contains_profanity": profanity_filter.contains_profanity,
+        "find_matches": profanity_filter.find_matches,
+        "censor_text": profanity_filter.censor_text,
+    }
+
+    worst = {name: (0.0, None) for name in checks}
+    over_budget = []
+    inputs = list(adversarial_inputs(profanity_filter)) + list(fuzz_inputs(fuzz_count))
+
+    for label, text in inputs:
+        for name, check in checks.items():
+            matcher.reset_cache()
+            elapsed = time_call(check, text)
+            if elapsed > worst[name][0]:
+                worst[name] = (elapsed, label)
+            if elapsed > BUDGETS_MS[name]:
+                over_budget.append((name, label, elapsed))
+
+    print(f"Inputs: {len(inputs)} (up to {MAX_MESSAGE_LENGTH} characters)")
+    for name, (elapsed, label) in worst.items():
+        print(f"{name:20} worst {elapsed:6.2f} ms of {BUDGETS_MS[name]} ms  ({label})")
+
+    if "--regex" in sys.argv:
+        regex_filter = ProfanityFilter(engine="regex", regex_length_limit=MAX_MESSAGE_LENGTH)
+        print("regex engine on the same shapes (shortened, it backtracks):")
+        for length in (50, 100, 200):
+            text = "p" + fit("*", length - 1)
+            print(f"  'p' + {length - 1} '*': {time_call(regex_filter.contains_profanity, text):8.1f} ms")
+
+    if over_budget:
+        for name, label, elapsed in over_budget[:20]:
+            print(f"OVER BUDGET: {name} on {label}: {elapsed:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark for the anti-raid sliding windows.
+
+Replays a busy guild (about 1000 messages a second by default, from a few
+thousand users with a handful of spammers) through the old list-based
+add_action and the deque-based AntiRaidSystem, on a simulated clock so both
+see the same timestamps. The old version rebuilds the window list and scans
+it for the author on every message, so its cost grows with the number of
+messages in the window; the new one should stay flat. Also checks that both
+flag the same messages.
+
+Usage: python benchmarks/bench_anti_raid.py [messages_per_second] [seconds]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anti_raid import AntiRaidSystem
+
+GUILD_ID = 1
+USERS = 5000
+SPAMMERS = 5
+
+
+class LegacyMessageWindow:
+    """The old message handling of AntiRaidSystem.add_action, with the clock passed in"""
+
+    def __init__(self, threshold=8, timeframe=5):
+        self.threshold = threshold
+        self.timeframe = timeframe
+        self.recent_actions = {}
+
+    def add_action(self, server_id, action_type, user_id, now):
+        if server_id not in self.recent_actions:
+            self.recent_actions[server_id] = {}
+        if action_type not in self.recent_actions[server_id]:
+            self.recent_actions[server_id][action_type] = []
+        self.recent_actions[server_id][action_type].append((user_id, now))
+        self.recent_actions[server_id][action_type] = [
+            (u_id, timestamp) for u_id, timestamp in self.recent_actions[server_id][action_type]
+            if (now - timestamp).total_seconds() < self.timeframe
+        ]
+        user_actions = [
+            u_id for u_id, _ in self.recent_actions[server_id][action_type]
+            if u_id == user_id
+        ]
+        return len(user_actions) >= self.threshold
+
+
+def build_traffic(rate, seconds, seed=3):
+    """
+    Return [(offset_microseconds, user_id)] for messages arriving at random at
+    about rate a second; spammers send a tenth of them.
+    """
+    rng = random.Random(seed)
+    traffic = []
+    offset = 0
+    while offset < seconds * 1e6:
+        offset += max(1, round(rng.expovariate(rate) * 1e6))
+        if rng.random() < 0.1:
+            user_id = rng.randrange(SPAMMERS)
+        else:
+            user_id = rng.randrange(SPAMMERS, USERS)
+        traffic.append((offset, user_id))
+    return traffic
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+    traffic = build_traffic(rate, seconds)
+
+    legacy = LegacyMessageWindow()
+    base = datetime(2024, 1, 1)
+    stamps = [base + timedelta(microseconds=offset) for offset, _ in traffic]
+    start = time.perf_counter()
+    legacy_flags = [legacy.add_action(GUILD_ID, 'message', user_id, now)
+                    for now, (_, user_id) in zip(stamps, traffic)]
+    legacy_time = time.perf_counter() - start
+
+    clock_now = [0.0]
+    anti_raid = AntiRaidSystem(clock=lambda: clock_now[0])
+    start = time.perf_counter()
+    current_flags = []
+    for offset, user_id in traffic:
+        clock_now[0] = offset / 1e6
+        current_flags.append(anti_raid.add_action(GUILD_ID, 'message', user_id))
+    current_time = time.perf_counter() - start
+
+    assert legacy_flags == current_flags, "the two versions flagged different messages"
+    count = len(traffic)
+    window = anti_raid.recent_actions[GUILD_ID]['message']
+    print(f"{count} messages at {rate}/s ({len(window)} in the {anti_raid.message_timeframe}s window), "
+          f"{sum(current_flags)} flagged as spam")
+    print(f"legacy lists   {legacy_time / count * 1e6:8.2f} us/message "
+          f"({legacy_time / seconds * 100:.1f}% of one core at this rate)")
+    print(f"deque windows  {current_time / count * 1e6:8.2f} us/message "
+          f"({current_time / seconds * 100:.2f}% of one core at this rate)")
+    print(f"speedup        {legacy_time / current_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark for link screening.
+
+Builds a blocklist of random domains (a million by default) in a temporary
+directory, then compares the old malicious-link check (a list of keyword
+patterns searched one at a time over the whole message) with LinkScreener on
+chat without links, chat with links and links to blocked domains. Also reports
+how long building and opening the blocklist take and the cost of one lookup.
+
+Usage: python benchmarks/bench_link_screen.py [domain_count] [message_count]
+"""
+import os
+import random
+import re
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_profanity_filter import build_messages
+from link_screen import MALICIOUS_KEYWORDS, DomainBlocklist, LinkScreener
+from profanity_filter import fold_text
+
+TLDS = ["com", "net", "org", "gift", "ru", "xyz", "io", "co.uk"]
+
+
+def random_domains(count, seed=5):
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits
+    domains = set()
+    while len(domains) < count:
+        name = "".join(rng.choices(alphabet, k=rng.randint(4, 16)))
+        domains.add(f"{name}.{rng.choice(TLDS)}")
+    return sorted(domains)
+
+
+def legacy_check(text):
+    """The check on_message used to run: every keyword pattern over the whole message"""
+    malicious_link_patterns = list(MALICIOUS_KEYWORDS)
+    folded = fold_text(text)
+    for pattern in malicious_link_patterns:
+        if re.search(pattern, folded):
+            return True
+    return False
+
+
+def time_check(check, messages, repeat=3):
+    """Return the best time per message over several runs, in microseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            check(message)
+        elapsed = (time.perf_counter() - start) / len(messages) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    domain_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = random.Random(11)
+    temp_dir = tempfile.mkdtemp(prefix="link-screen-")
+    path = os.path.join(temp_dir, "blocked_domains.txt")
+
+    try:
+        domains = random_domains(domain_count)
+        start = time.perf_counter()
+        DomainBlocklist.build(domains, path)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        screener = LinkScreener(path)
+        open_ms = (time.perf_counter() - start) * 1000
+        print(f"Blocklist: {domain_count} domains, {os.path.getsize(path) / 2 ** 20:.1f} MB, "
+              f"built in {build_seconds:.2f} s, opened in {open_ms:.3f} ms")
+
+        blocklist = screener.blocklist
+        lookups = [rng.choice(domains) for _ in range(10000)] + [f"missing{i}.com" for i in range(10000)]
+        print(f"Lookup: {time_check(blocklist.__contains__, lookups):.2f} us")
+
+        chat = build_messages(message_count)
+        traffic = {
+            "chat": chat,
+            "chat + link": [f"{message} https://www.example{i % 50}.com/watch?v={i}" for i, message in enumerate(chat)],
+            "blocked link": [f"{message} https://login.{rng.choice(domains)}/claim" for message in chat],
+        }
+        for name, messages in traffic.items():
+            flagged = sum(1 for message in messages if screener.is_malicious(message))
+            legacy = time_check(legacy_check, messages)
+            screened = time_check(screener.is_malicious, messages)
+            print(f"{name:13} legacy {legacy:7.2f} us/message, screener {screened:7.2f} us/message "
+                  f"({legacy / screened:.1f}x), {flagged / len(messages):.0%} flagged")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
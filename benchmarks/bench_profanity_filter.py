@@ -0,0 +1,133 @@
+"""
+Benchmark for the profanity filter engines.
+
+Runs the per-word regex loop and the single-pass automaton over the same
+batch of clean chat messages and reports messages per second for each,
+then compares censor_text on messages that do contain profanity. Before
+timing, checks that both engines agree on the clean messages and on words
+from the lists written with characters re.IGNORECASE treats as the same
+letter ("ı" or "İ" for "i", "ſ" for "s"); exits with status 1 if they don't.
+
+Usage: python benchmarks/bench_profanity_filter.py [message_count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profanity_filter import IGNORECASE_EQUIVALENTS, ProfanityFilter, fold_case
+
+# Everyday chat vocabulary used to build clean messages
+CHAT_WORDS = [
+    "hey", "hello", "yo", "gg", "lol", "lmao", "nice", "thanks", "anyone", "want", "to", "play",
+    "later", "tonight", "the", "new", "update", "is", "out", "did", "you", "see", "that", "stream",
+    "jotaro", "dio", "stand", "power", "za", "warudo", "ora", "muda", "part", "five", "best", "arc",
+    "what", "time", "event", "start", "i", "think", "we", "should", "join", "voice", "channel",
+    "my", "internet", "slow", "today", "brb", "going", "eat", "dinner", "back", "in", "ten", "minutes",
+    "who", "won", "last", "match", "can", "someone", "help", "me", "with", "this", "quest", "please",
+    "classic", "assistant", "grass", "shell", "skill", "title", "analysis", "passion", "scunthorpe",
+]
+
+
+def build_messages(count, seed=1234):
+    """Build a reproducible list of clean chat messages"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.choices(CHAT_WORDS, k=rng.randint(3, 18))
+        message = " ".join(words)
+        if rng.random() < 0.3:
+            message = message.capitalize() + rng.choice(["!", "?", "...", " :)", ""])
+        messages.append(message)
+    return messages
+
+
+def build_dirty_messages(messages, profanity_filter, seed=4321):
+    """Insert a word from the filter's lists into each message"""
+    rng = random.Random(seed)
+    words = profanity_filter.profanity_words + profanity_filter.harassment_words
+    dirty = []
+    for message in messages:
+        parts = message.split()
+        parts.insert(rng.randint(0, len(parts)), rng.choice(words))
+        dirty.append(" ".join(parts))
+    return dirty
+
+
+def case_equivalents(char):
+    """Return the characters re.IGNORECASE compares as the same letter as char, other than char"""
+    folded = fold_case(char)
+    equivalents = {source for source, target in IGNORECASE_EQUIVALENTS.items() if target == folded}
+    equivalents.update(variant for variant in (char.upper(), char.lower()) if len(variant) == 1)
+    equivalents.discard(char)
+    return sorted(equivalents)
+
+
+def build_case_variants(profanity_filter, per_word=5, seed=99):
+    """Write every listed word a few ways with case-equivalent characters swapped in"""
+    rng = random.Random(seed)
+    variants = []
+    for word in profanity_filter.profanity_words + profanity_filter.harassment_words:
+        for _ in range(per_word):
+            chars = []
+            for char in word:
+                equivalents = case_equivalents(char)
+                chars.append(rng.choice(equivalents) if equivalents and rng.random() < 0.6 else char)
+            variants.append(rng.choice(["{}", "you {} lol", "..{}.."]).format("".join(chars)))
+    return variants
+
+
+def time_engine(profanity_filter, messages, repeat=3, method="contains_profanity"):
+    """Return the best time to run a filter method on every message, in seconds"""
+    check = getattr(profanity_filter, method)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            check(message)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    messages = build_messages(count)
+
+    regex_filter = ProfanityFilter(engine="regex")
+    automaton_filter = ProfanityFilter(engine="automaton")
+
+    # Only clean chat is measured, so drop anything either engine flags
+    messages = [m for m in messages if not regex_filter.contains_profanity(m)]
+    flagged = [m for m in messages if automaton_filter.contains_profanity(m)]
+    if flagged:
+        print(f"Engines disagree on {len(flagged)} messages, e.g. {flagged[0]!r}")
+        sys.exit(1)
+    variants = build_case_variants(regex_filter)
+    missed = [v for v in variants if regex_filter.contains_profanity(v) != automaton_filter.contains_profanity(v)]
+    if missed:
+        print(f"Engines disagree on {len(missed)} of {len(variants)} case variants, e.g. {missed[0]!r}")
+        sys.exit(1)
+
+    regex_time = time_engine(regex_filter, messages)
+    automaton_time = time_engine(automaton_filter, messages)
+
+    print(f"Messages checked: {len(messages)}")
+    print(f"regex loop: {regex_time * 1000:.1f} ms ({len(messages) / regex_time:,.0f} msg/s)")
+    print(f"automaton:  {automaton_time * 1000:.1f} ms ({len(messages) / automaton_time:,.0f} msg/s)")
+    print(f"Speedup: {regex_time / automaton_time:.1f}x")
+    print(f"Matcher states cached: {automaton_filter.matcher.state_count}")
+
+    dirty = build_dirty_messages(messages[:1000], regex_filter)
+    regex_time = time_engine(regex_filter, dirty, method="censor_text")
+    automaton_time = time_engine(automaton_filter, dirty, method="censor_text")
+    print(f"censor_text on {len(dirty)} messages with profanity:")
+    print(f"regex loop: {regex_time * 1000:.1f} ms, automaton: {automaton_time * 1000:.1f} ms "
+          f"({regex_time / automaton_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
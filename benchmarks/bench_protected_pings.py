@@ -0,0 +1,78 @@
+"""
+Benchmark for protected-user ping detection.
+
+Compares the old check (two substring searches per protected user over the
+message text) with ProtectedUsers.pinged on chat without mentions, chat that
+mentions unprotected users and chat that pings a protected user, for
+protected lists from a couple of users to tens of thousands. The new timings
+include parsing the mentions out of the text, which discord.py does for
+message.raw_mentions.
+
+Usage: python benchmarks/bench_protected_pings.py [message_count]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_profanity_filter import build_messages
+from protected_users import ProtectedUsers
+
+LIST_SIZES = [2, 100, 1000, 10000, 50000]
+GUILD_ID = 1
+
+# What discord.py's Message.raw_mentions parses
+MENTION_PATTERN = re.compile(r'<@!?([0-9]{15,20})>')
+
+
+def raw_mentions(content):
+    return [int(user_id) for user_id in MENTION_PATTERN.findall(content)]
+
+
+def legacy_pinged(content, protected_ids):
+    for user_id in protected_ids:
+        if f"<@{user_id}>" in content or f"<@!{user_id}>" in content:
+            return user_id
+    return None
+
+
+def time_check(check, messages, repeat=3):
+    """Return the best time per message over several runs, in microseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            check(message)
+        elapsed = (time.perf_counter() - start) / len(messages) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(8)
+    chat = build_messages(count)
+
+    for size in LIST_SIZES:
+        protected_ids = [rng.randrange(10 ** 17, 10 ** 18) for _ in range(size)]
+        legacy_ids = [str(user_id) for user_id in protected_ids]
+        protected_users = ProtectedUsers(protected_ids)
+        traffic = {
+            "no mentions": chat,
+            "mentions": [f"<@{rng.randrange(10 ** 17, 10 ** 18)}> {message}" for message in chat],
+            "protected": [f"{message} <@!{rng.choice(protected_ids)}>" for message in chat],
+        }
+        print(f"{size} protected users")
+        for name, messages in traffic.items():
+            # Fewer runs for the slow case so the benchmark finishes
+            sample = messages if size <= 1000 else messages[:max(1, count // 20)]
+            legacy = time_check(lambda content: legacy_pinged(content, legacy_ids), sample)
+            current = time_check(lambda content: protected_users.pinged(GUILD_ID, raw_mentions(content)), messages)
+            print(f"  {name:12} legacy {legacy:10.2f} us/message, mention set {current:6.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
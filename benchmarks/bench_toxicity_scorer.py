@@ -0,0 +1,71 @@
+"""
+Benchmark for the toxicity scorer.
+
+Trains a model on generated chat (clean messages, and the same messages with a
+word from the wordlists inserted), then times scoring one message at a time
+(what on_message does) and in batches (what !sweep does), including the n-gram
+hashing. Messages up to Discord's 4000 character limit are timed too.
+
+Exits with status 1 if scoring takes more than the budget per message.
+
+Usage: python benchmarks/bench_toxicity_scorer.py [message_count]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_profanity_filter import build_dirty_messages, build_messages
+from profanity_filter import ProfanityFilter
+from toxicity_scorer import ToxicityScorer
+
+# Budget per message in milliseconds
+BUDGET_MS = 1.0
+BATCH_SIZES = [1, 16, 100, 1000]
+MAX_MESSAGE_LENGTH = 4000
+
+
+def time_scoring(scorer, messages, batch_size, repeat=3):
+    """Return the best time per message over several runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for index in range(0, len(messages), batch_size):
+            scorer.score_batch(messages[index:index + batch_size])
+        elapsed = (time.perf_counter() - start) / len(messages) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    profanity_filter = ProfanityFilter()
+    clean = build_messages(count)
+    dirty = build_dirty_messages(clean, profanity_filter)
+
+    # Train on the first half and check accuracy on the second
+    half = count // 2
+    start = time.perf_counter()
+    scorer = ToxicityScorer.train(clean[:half] + dirty[:half], [0] * half + [1] * half)
+    print(f"Trained on {2 * half} messages in {time.perf_counter() - start:.2f} s")
+    held_clean = scorer.score_batch(clean[half:]) < 0.5
+    held_dirty = scorer.score_batch(dirty[half:]) >= 0.5
+    print(f"Held-out accuracy: clean {held_clean.mean():.1%}, toxic {held_dirty.mean():.1%}")
+
+    messages = clean[half:] + dirty[half:]
+    long_messages = [(message + " ") * (MAX_MESSAGE_LENGTH // (len(message) + 1)) for message in messages[:200]]
+    over_budget = False
+    for name, sample in (("chat", messages), ("4000 chars", long_messages)):
+        for batch_size in BATCH_SIZES:
+            elapsed = time_scoring(scorer, sample, batch_size)
+            status = "" if elapsed <= BUDGET_MS else "  OVER BUDGET"
+            over_budget = over_budget or elapsed > BUDGET_MS
+            print(f"{name:10} batch {batch_size:5}: {elapsed * 1000:8.1f} us/message{status}")
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Regression check for wordlist pruning.
+
+Builds a corpus of bypass attempts for every word on the lists (lookalike
+characters, characters re.IGNORECASE treats as the same letter such as "ı",
+"İ" and "ſ", separators, repeated letters, changed case, words glued to other
+text) plus clean chat, and checks that a filter with pruning gives the same
+results as one without it on both engines: the same contains_profanity verdicts,
+the same characters inside matches and the same censored text. The unpruned
+engines must also give each other the same verdicts. Overlapping
+matches of one word are only reported once, so a pruned word's match can
+disappear into the covering word's match that contains it; that's why the spans
+are compared after merging. Then prints what was pruned and how much smaller
+and faster the pruned filter is.
+
+Exits with status 1 if any result differs.
+
+Usage: python benchmarks/check_pruning.py [variants_per_word] [corpus_file]
+    corpus_file adds one message per line to the generated corpus
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_profanity_filter import case_equivalents
+from profanity_filter import CHARACTER_CLASSES, SEPARATOR_CHARS, ProfanityFilter, merge_spans
+
+CLEAN_MESSAGES = [
+    "hey everyone, who's up for a game tonight?",
+    "the assessment is due on friday",
+    "I passed the class with a good grade",
+    "Scunthorpe is a town in England",
+    "nice shot! that was a clutch play",
+    "can someone help me set up the bot?",
+    "the document is in the shared drive",
+]
+
+
+def variants(word, rng, count):
+    """Yield ways someone might type a word to get past the filter"""
+    separators = SEPARATOR_CHARS + " "
+    yield word
+    yield word.upper()
+    yield f"you {word} lol"
+    yield f"x{word}"
+    yield f"{word}s"
+    for _ in range(count):
+        chars = []
+        for char in word:
+            choices = CHARACTER_CLASSES.get(char, char)
+            choice = rng.choice(choices) if rng.random() < 0.5 else char
+            equivalents = case_equivalents(choice)
+            if equivalents and rng.random() < 0.3:
+                choice = rng.choice(equivalents)
+            chars.append(choice)
+            if rng.random() < 0.3:
+                chars.append(chars[-1] * rng.randint(1, 4))
+            if rng.random() < 0.3:
+                chars.append(rng.choice(separators) * rng.randint(1, 2))
+        text = "".join(chars)
+        if rng.random() < 0.5:
+            text = text.upper()
+        yield rng.choice(["{}", "{} !", "so {} ok", "..{}..", "a{}", "{}9"]).format(text)
+
+
+def build_corpus(profanity_filter, count, corpus_file=None, seed=7):
+    rng = random.Random(seed)
+    corpus = list(CLEAN_MESSAGES)
+    for word in profanity_filter.profanity_words + profanity_filter.harassment_words:
+        corpus.extend(variants(word, rng, count))
+    if corpus_file:
+        with open(corpus_file, encoding="utf-8") as f:
+            corpus.extend(line.rstrip("\n") for line in f)
+    return corpus
+
+
+def results(profanity_filter, text):
+    """Return (verdict, merged match spans, censored text) for a text"""
+    spans = merge_spans((match.start, match.end) for match in profanity_filter.find_matches(text))
+    return profanity_filter.contains_profanity(text), spans, profanity_filter.censor_text(text)
+
+
+def compare(engine, corpus):
+    """Return (text, expected, actual) for every text where pruning changes a result on an engine"""
+    pruned = ProfanityFilter(engine=engine)
+    full = ProfanityFilter(engine=engine, prune=False)
+    differences = []
+    for text in corpus:
+        expected = results(full, text)
+        actual = results(pruned, text)
+        if expected != actual:
+            differences.append((text, expected, actual))
+    return differences
+
+
+def time_scan(profanity_filter, corpus, repeat=5):
+    """Return the best time to check the whole corpus, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            profanity_filter.contains_profanity(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 20
+    corpus_file = args[1] if len(args) > 1 else None
+
+    full = ProfanityFilter(prune=False)
+    pruned = ProfanityFilter()
+    corpus = build_corpus(full, count, corpus_file)
+    print(f"Corpus: {len(corpus)} messages")
+
+    failed = False
+    for engine in ProfanityFilter.ENGINES:
+        differences = compare(engine, corpus)
+        print(f"{engine:9} {len(differences)} differences")
+        for text, expected, actual in differences[:10]:
+            print(f"  {text!r}: expected {expected}, got {actual}")
+        failed = failed or bool(differences)
+
+    regex_full = ProfanityFilter(engine="regex", prune=False)
+    disagreements = [text for text in corpus
+                     if regex_full.contains_profanity(text) != full.contains_profanity(text)]
+    print(f"engines   {len(disagreements)} verdicts differ between regex and automaton")
+    for text in disagreements[:10]:
+        print(f"  {text!r}: regex {regex_full.contains_profanity(text)}, automaton {full.contains_profanity(text)}")
+    failed = failed or bool(disagreements)
+
+    report = pruned.pruning_report()
+    print(f"\nPruned {len(report)} of {len(pruned.profanity_words) + len(pruned.harassment_words)} words:")
+    for word, covered_by in report:
+        print(f"  {word!r} (covered by {covered_by!r})")
+
+    print(f"\nTrie nodes: {full.matcher.node_count} -> {pruned.matcher.node_count}")
+    regex_pruned = ProfanityFilter(engine="regex")
+    print(f"Regex patterns: {len(full.profanity_words) + len(full.harassment_words)} -> {len(regex_pruned.patterns)}")
+    for name, profanity_filter in (("full", full), ("pruned", pruned), ("regex", regex_pruned)):
+        # Warm the state cache first, then time the steady state
+        time_scan(profanity_filter, corpus, repeat=1)
+        print(f"{name:7} scan {time_scan(profanity_filter, corpus):8.2f} ms")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+# What on_message enforces in a channel
+ChannelPolicy = namedtuple("ChannelPolicy", ["restricted", "admin_channel", "admin_category", "welcome"])
+
+
+class ChannelPolicyIndex:
+    """
+    Maps channel IDs to the policy configured for them.
+
+    The configured channel and category IDs are compiled into one record per
+    channel that has any policy, so on_message does a single dict lookup
+    instead of scanning ID lists. Channel IDs are unique across Discord, so all
+    guilds share one dict; each guild also keeps the set of its indexed
+    channels so it can be rebuilt or dropped on its own. Keep it current by
+    calling index_channel on channel create and update events and
+    remove_channel on delete. Threads aren't indexed: they get the
+    admin-category part of their parent's policy.
+    """
+
+    def __init__(self, restricted_channel_ids=(), admin_channel_ids=(), admin_category_ids=(),
+                 welcome_channel_ids=()):
+        self.restricted_channel_ids = frozenset(restricted_channel_ids)
+        self.admin_channel_ids = frozenset(admin_channel_ids)
+        self.admin_category_ids = frozenset(admin_category_ids)
+        self.welcome_channel_ids = frozenset(welcome_channel_ids)
+        self._policies = {}
+        self._guild_channels = {}
+
+    def compile_policy(self, channel_id, category_id):
+        """Return the policy for a channel in a category, or None if nothing applies"""
+        policy = ChannelPolicy(
+            restricted=channel_id in self.restricted_channel_ids,
+            admin_channel=channel_id in self.admin_channel_ids,
+            admin_category=category_id in self.admin_category_ids,
+            welcome=channel_id in self.welcome_channel_ids,
+        )
+        return policy if any(policy) else None
+
+    def index_channel(self, channel):
+        """Add, update or drop the record for one guild channel"""
+        policy = self.compile_policy(channel.id, getattr(channel, "category_id", None))
+        guild_channels = self._guild_channels.setdefault(channel.guild.id, set())
+        if policy is None:
+            self._policies.pop(channel.id, None)
+            guild_channels.discard(channel.id)
+        else:
+            self._policies[channel.id] = policy
+            guild_channels.add(channel.id)
+
+    def remove_channel(self, channel):
+        self._policies.pop(channel.id, None)
+        self._guild_channels.get(channel.guild.id, set()).discard(channel.id)
+
+    def index_guild(self, guild):
+        """(Re)build the records for every channel of a guild"""
+        self.remove_guild(guild.id)
+        for channel in guild.channels:
+            self.index_channel(channel)
+
+    def remove_guild(self, guild_id):
+        for channel_id in self._guild_channels.pop(guild_id, ()):
+            self._policies.pop(channel_id, None)
+
+    def get(self, channel):
+        """Return the policy for the channel a message was sent in, or None"""
+        policy = self._policies.get(channel.id)
+        if policy is None:
+            parent_id = getattr(channel, "parent_id", None)
+            if parent_id is not None:
+                parent = self._policies.get(parent_id)
+                if parent is not None and parent.admin_category:
+                    return ChannelPolicy(False, False, True, False)
+        return policy
+
+    def guild_policies(self, guild_id):
+        """Return {channel_id: policy} for a guild"""
+        return {channel_id: self._policies[channel_id] for channel_id in self._guild_channels.get(guild_id, ())}
+
+    def __len__(self):
+        return len(self._policies)
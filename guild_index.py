@@ -0,0 +1,147 @@
+import discord
+
+
+class NameIndex:
+    """The IDs of one kind of guild object (text channels, categories, roles) by case-folded name"""
+
+    def __init__(self):
+        self.ids_by_name = {}
+        self.name_by_id = {}
+
+    def add(self, object_id, name):
+        self.discard(object_id)
+        key = name.casefold()
+        self.ids_by_name.setdefault(key, set()).add(object_id)
+        self.name_by_id[object_id] = key
+
+    def discard(self, object_id):
+        key = self.name_by_id.pop(object_id, None)
+        if key is None:
+            return
+        ids = self.ids_by_name[key]
+        ids.discard(object_id)
+        if not ids:
+            del self.ids_by_name[key]
+
+    def find(self, name, resolve, exact=False):
+        """
+        Return the object with a name, resolved from its ID, or None.
+        An exact match wins over one that only matches ignoring case; with
+        exact=True only exact matches count. Ties go to the lowest position,
+        the one discord.utils.get would find first.
+        """
+        ids = self.ids_by_name.get(name.casefold())
+        if not ids:
+            return None
+        matches = [found for found in map(resolve, ids) if found is not None]
+        exact_matches = [found for found in matches if found.name == name]
+        if exact_matches or exact:
+            matches = exact_matches
+        if not matches:
+            return None
+        return min(matches, key=lambda found: (found.position, found.id))
+
+    def __len__(self):
+        return len(self.name_by_id)
+
+
+class GuildEntry:
+    def __init__(self):
+        self.text_channels = NameIndex()
+        self.categories = NameIndex()
+        self.roles = NameIndex()
+        self.admin_role_ids = set()
+
+
+class GuildIndex:
+    """
+    Finds a guild's channels and roles by name without scanning them.
+
+    Each guild's text channels, categories and roles are indexed by name,
+    and the roles with the administrator permission are kept in a set. Only
+    IDs are stored and they are resolved through the guild's own cache, so a
+    lookup always returns the current object. A guild is indexed the first
+    time it is looked up (or by index_guild); keep it current by calling
+    index_channel/index_role on create and update events and
+    remove_channel/remove_role on delete.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+
+    def _entry(self, guild):
+        entry = self._guilds.get(guild.id)
+        if entry is None:
+            entry = self.index_guild(guild)
+        return entry
+
+    def index_guild(self, guild):
+        """(Re)build the index for a guild"""
+        entry = GuildEntry()
+        self._guilds[guild.id] = entry
+        for channel in guild.channels:
+            self._add_channel(entry, channel)
+        for role in guild.roles:
+            self._add_role(entry, role)
+        return entry
+
+    def remove_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def _add_channel(self, entry, channel):
+        if isinstance(channel, discord.TextChannel):
+            entry.text_channels.add(channel.id, channel.name)
+        elif isinstance(channel, discord.CategoryChannel):
+            entry.categories.add(channel.id, channel.name)
+
+    def _add_role(self, entry, role):
+        entry.roles.add(role.id, role.name)
+        if role.permissions.administrator:
+            entry.admin_role_ids.add(role.id)
+        else:
+            entry.admin_role_ids.discard(role.id)
+
+    def index_channel(self, channel):
+        """Add or update a channel (call on channel create and update)"""
+        entry = self._guilds.get(channel.guild.id)
+        if entry is not None:
+            self._add_channel(entry, channel)
+
+    def remove_channel(self, channel):
+        entry = self._guilds.get(channel.guild.id)
+        if entry is not None:
+            entry.text_channels.discard(channel.id)
+            entry.categories.discard(channel.id)
+
+    def index_role(self, role):
+        """Add or update a role (call on role create and update)"""
+        entry = self._guilds.get(role.guild.id)
+        if entry is not None:
+            self._add_role(entry, role)
+
+    def remove_role(self, role):
+        entry = self._guilds.get(role.guild.id)
+        if entry is not None:
+            entry.roles.discard(role.id)
+            entry.admin_role_ids.discard(role.id)
+
+    def text_channel(self, guild, name):
+        """Return the text channel with a name (text channel names are always lowercase)"""
+        return self._entry(guild).text_channels.find(name, guild.get_channel)
+
+    def category(self, guild, name):
+        """Return the category with a name, ignoring case"""
+        return self._entry(guild).categories.find(name, guild.get_channel)
+
+    def role(self, guild, name, exact=False):
+        """Return the role with a name, ignoring case unless exact is set"""
+        return self._entry(guild).roles.find(name, guild.get_role, exact=exact)
+
+    def admin_role(self, guild):
+        """Return the lowest role with the administrator permission, or None"""
+        roles = [guild.get_role(role_id) for role_id in self._entry(guild).admin_role_ids]
+        roles = [role for role in roles if role is not None]
+        return min(roles, key=lambda role: (role.position, role.id)) if roles else None
+
+    def __len__(self):
+        return len(self._guilds)
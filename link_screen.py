@@ -0,0 +1,288 @@
+"""
+Link screening for malicious-content detection.
+
+LinkScreener pulls every link out of a message with one compiled pattern and
+checks its host against a domain blocklist, then runs a compiled keyword
+pattern over the links that aren't blocked (scam and porn keywords in the host
+or path). Plain words outside of links are left to the other filters.
+
+The blocklist is a text file with one domain per line, sorted byte-wise. It is
+memory-mapped and searched with a binary search, so opening it is instant and
+a lookup reads a few pages however many millions of domains it holds. A host
+is blocked when it or any domain it belongs to is on the list (a blocked
+evil.com also blocks cdn.evil.com). Build the file from any list of domains or
+hosts-file style lines with:
+
+    python link_screen.py build domains.txt blocked_domains.txt
+"""
+import logging
+import mmap
+import os
+import re
+import sys
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+
+from profanity_filter import fold_text
+
+logger = logging.getLogger('link_screen')
+
+# Links with a scheme or www., and bare domain names like free-nitro.gift/claim
+URL_PATTERN = re.compile(
+    r'(?:https?://|www\.)[^\s<>"\'`|]+'
+    r'|(?<![\w@.-])(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24}\b(?:[/?#][^\s<>"\'`|]*)?',
+    re.IGNORECASE
+)
+TRAILING_PUNCTUATION = ".,;:!?)]}*_~'\""
+HOST_END = re.compile(r'[/?#\\]')
+
+# Keywords checked in links that aren't on the blocklist (on folded text, so lookalikes count)
+MALICIOUS_KEYWORDS = [
+    r'porn', r'xxx', r'sex', r'adult', r'nude', r'naked',  # Porn links
+    r'free.?nitro', r'discord.?nitro', r'steam.?gift',      # Common Discord scams
+    r'giveaway', r'free.?robux', r'free.?vbucks',           # Common gaming scams
+    r'account.?steal', r'password.?hack', r'login.?info',   # Phishing indicators
+    r'viruslink', r'malware', r'trojan', r'suspicious.?site' # Explicit malware
+]
+
+# Sites the keyword check skips (their paths are video ids and the like, which hit keywords by chance)
+TRUSTED_DOMAINS = frozenset({
+    "discord.com", "discord.gg", "discordapp.com", "discordapp.net", "tenor.com", "giphy.com",
+    "youtube.com", "youtu.be", "twitch.tv", "twitter.com", "x.com", "reddit.com", "github.com",
+    "spotify.com", "wikipedia.org",
+})
+
+Link = namedtuple("Link", ["url", "host"])
+LinkVerdict = namedtuple("LinkVerdict", ["reason", "link", "match"])
+
+
+def link_host(url):
+    """Return the lowercase host name of a link (without scheme, user, port or trailing dot)"""
+    host = url.split("://", 1)[-1]
+    host = HOST_END.split(host, maxsplit=1)[0]
+    host = host.rpartition("@")[2].partition(":")[0].strip(".").lower()
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    return host
+
+
+def parent_domains(host):
+    """Yield a host and every domain above it, down to the top-level domain's parent"""
+    labels = host.split(".")
+    for index in range(len(labels) - 1):
+        yield ".".join(labels[index:])
+
+
+def extract_links(text):
+    """Return the links in a message, in order"""
+    if "." not in text:
+        return []
+    links = []
+    for match in URL_PATTERN.finditer(text):
+        url = match.group().rstrip(TRAILING_PUNCTUATION)
+        host = link_host(url)
+        if "." in host:
+            links.append(Link(url, host))
+    return links
+
+
+def clean_domain(line):
+    """Turn a blocklist source line (a domain, URL or hosts-file entry) into a domain, or None"""
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    parts = line.split()
+    # Hosts files list "0.0.0.0 domain"
+    domain = link_host(parts[-1]).lstrip("*.")
+    return domain if "." in domain else None
+
+
+class DomainBlocklist:
+    """
+    A sorted domain file searched in place.
+
+    The file is memory-mapped rather than read, so the operating system pages
+    in only the parts the binary search touches. Every search starts with the
+    same probes, so the lines read by the first levels are kept in memory, and
+    once the range is a few lines long it is read in one slice. An empty or
+    missing file blocks nothing.
+    """
+
+    MAX_PROBES = 1 << 15  # The first 15 levels of the search
+    SCAN_BYTES = 512
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.size = 0
+        self.mtime = None
+        self._probes = {}
+        self._open()
+
+    def _open(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        if self.size == 0:
+            return
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    def changed(self):
+        """True if the file was replaced, edited or removed since it was opened"""
+        try:
+            return os.stat(self.path).st_mtime != self.mtime
+        except OSError:
+            return self.mtime is not None
+
+    def __contains__(self, domain):
+        mapped = self._map
+        if mapped is None:
+            return False
+        key = domain.encode("ascii", "ignore")
+        probes = self._probes
+        low, high = 0, len(mapped)
+        # low and high always sit at the start of a line
+        while high - low > self.SCAN_BYTES:
+            probe = probes.get((low, high))
+            if probe is None:
+                middle = (low + high) // 2
+                start = mapped.rfind(b"\n", low, middle)
+                start = low if start < 0 else start + 1
+                end = mapped.find(b"\n", start, high)
+                if end < 0:
+                    end = high
+                probe = (start, end, mapped[start:end].rstrip(b"\r"))
+                if len(probes) < self.MAX_PROBES:
+                    probes[(low, high)] = probe
+            start, end, line = probe
+            if line < key:
+                low = end + 1
+            elif line > key:
+                high = start
+            else:
+                return True
+        # The last few lines are read in one go
+        lines = mapped[low:high].rstrip(b"\n").split(b"\n")
+        index = bisect_left(lines, key)
+        return index < len(lines) and lines[index].rstrip(b"\r") == key
+
+    def blocked_domain(self, host):
+        """Return the listed domain a host belongs to, or None"""
+        for domain in parent_domains(host):
+            if domain in self:
+                return domain
+        return None
+
+    @staticmethod
+    def build(lines, path):
+        """Write a blocklist file from source lines; returns the number of domains"""
+        domains = sorted({domain for domain in map(clean_domain, lines) if domain},
+                         key=lambda domain: domain.encode("ascii", "ignore"))
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="ascii", errors="ignore", newline="\n") as f:
+            for domain in domains:
+                f.write(domain + "\n")
+        os.replace(temp_path, path)
+        return len(domains)
+
+
+class LinkScreener:
+    """
+    Checks the links in messages against a domain blocklist and scam keywords.
+
+    check returns the first reason a message's links are malicious, or None.
+    Messages without a dot are skipped before any pattern runs. Chat links
+    mostly point to the same few sites, so the blocklist result for the most
+    recent hosts is kept (trusted sites are never looked up).
+    """
+
+    MAX_HOSTS = 4096
+
+    def __init__(self, blocklist_path=None, keywords=MALICIOUS_KEYWORDS, trusted_domains=TRUSTED_DOMAINS):
+        self.blocklist_path = blocklist_path
+        self.blocklist = DomainBlocklist(blocklist_path) if blocklist_path else None
+        self.keyword_pattern = re.compile("|".join(f"(?:{keyword})" for keyword in keywords))
+        self.trusted_domains = trusted_domains
+        # host -> (blocked domain or None, trusted)
+        self._hosts = OrderedDict()
+        self.links_checked = 0
+        self.blocked = 0
+        self.keyword_hits = 0
+
+    def is_trusted(self, host):
+        return any(domain in self.trusted_domains for domain in parent_domains(host))
+
+    def _host_verdict(self, host):
+        """Return (blocked domain or None, trusted) for a host"""
+        verdict = self._hosts.get(host)
+        if verdict is not None:
+            self._hosts.move_to_end(host)
+            return verdict
+        trusted = self.is_trusted(host)
+        blocked = None
+        if not trusted and self.blocklist is not None:
+            blocked = self.blocklist.blocked_domain(host)
+        verdict = self._hosts[host] = (blocked, trusted)
+        if len(self._hosts) > self.MAX_HOSTS:
+            self._hosts.popitem(last=False)
+        return verdict
+
+    def check(self, text):
+        """Return a LinkVerdict for the first malicious link in a message, or None"""
+        for link in extract_links(text):
+            self.links_checked += 1
+            blocked, trusted = self._host_verdict(link.host)
+            if blocked:
+                self.blocked += 1
+                return LinkVerdict("blocklist", link, blocked)
+            if trusted:
+                continue
+            keyword = self.keyword_pattern.search(fold_text(link.url))
+            if keyword:
+                self.keyword_hits += 1
+                return LinkVerdict("keyword", link, keyword.group())
+        return None
+
+    def is_malicious(self, text):
+        return self.check(text) is not None
+
+    def blocklist_changed(self):
+        return self.blocklist is not None and self.blocklist.changed()
+
+    def reload_blocklist(self):
+        """Open the blocklist file again (after it was rebuilt)"""
+        if self.blocklist_path:
+            old = self.blocklist
+            self.blocklist = DomainBlocklist(self.blocklist_path)
+            self._hosts.clear()
+            if old is not None:
+                old.close()
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "build":
+        with open(args[1], encoding="utf-8", errors="ignore") as f:
+            count = DomainBlocklist.build(f, args[2])
+        print(f"Wrote {count} domains to {args[2]}")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,20 @@ import json
 import pickle
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from profanity_filter import ProfanityFilter
+from profanity_filter import ProfanityFilter, VerdictCache
+from shadow_mode import ShadowEvaluator
+from toxicity_scorer import load_toxicity_scorer
+from link_screen import LinkScreener
+from message_pipeline import MessagePipeline
+from ttl_cache import TTLCache
+from channel_policy import ChannelPolicyIndex
+from anti_raid import AntiRaidSystem
+from protected_users import ProtectedUsers
+from scheduled_deletions import DeletionScheduler
+from guild_index import GuildIndex
+from mod_log import ModLogSink
+from recent_messages import RecentMessages, BULK_DELETE_MAX_AGE
+from moderation_queue import ModerationQueues, PRIORITY_ENFORCE, PRIORITY_NOTIFY, PRIORITY_COSMETIC, PRIORITY_NAMES
 from jojo_references import get_random_jojo_quote, get_jojo_stand, JOJO_CHARACTERS
 from scanner import scan_message
 from keep_alive import keep_alive
@@ -73,7 +86,73 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
 # Initialize profanity filter
-profanity_filter = ProfanityFilter()
+# The compiled matcher is cached on disk so restarts don't have to rebuild it
+FILTER_CACHE_DIR = "filter_cache"
+# Words moderators added or removed for their own server
+GUILD_WORDLISTS_FILE = "guild_wordlists.json"
+profanity_filter = ProfanityFilter(cache_dir=FILTER_CACHE_DIR, guild_wordlists_path=GUILD_WORDLISTS_FILE)
+
+# Channel sweeps: worker processes used to check history (0 checks on the bot's own process).
+# They are forked now, while the bot has no other threads (see ProfanityFilter.start_batch_pool)
+SWEEP_PROCESSES = int(os.getenv("SWEEP_PROCESSES", "0"))
+if SWEEP_PROCESSES > 0:
+    profanity_filter.start_batch_pool(SWEEP_PROCESSES)
+
+# Verdicts for recently checked message content, so copies of the same spam skip the checks
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "4096"))  # Entries (0 disables the cache)
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", "300"))  # Seconds
+verdict_cache = VerdictCache(max_entries=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL)
+
+# Shadow mode: run a candidate filter engine next to the live one on sampled traffic
+# Set SHADOW_ENGINE (e.g. "regex") to turn it on; results go to SHADOW_LOG_FILE
+SHADOW_ENGINE = os.getenv("SHADOW_ENGINE", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))
+SHADOW_LOG_FILE = os.getenv("SHADOW_LOG_FILE", "shadow_mode.jsonl")
+shadow_mode = ShadowEvaluator(
+    primary_factory=lambda: ProfanityFilter(cache_dir=FILTER_CACHE_DIR),
+    candidate_factory=lambda: ProfanityFilter(engine=SHADOW_ENGINE, cache_dir=FILTER_CACHE_DIR),
+    sample_rate=SHADOW_SAMPLE_RATE,
+    log_path=SHADOW_LOG_FILE
+)
+if SHADOW_ENGINE:
+    shadow_mode.start()
+
+# Optional second stage: a classifier trained offline (see toxicity_scorer.py) scores
+# messages the wordlists let through. Set TOXICITY_MODEL to a model file to turn it on
+TOXICITY_MODEL = os.getenv("TOXICITY_MODEL", "")
+TOXICITY_THRESHOLD = float(os.getenv("TOXICITY_THRESHOLD", "0.9"))
+toxicity_scorer = load_toxicity_scorer(TOXICITY_MODEL)
+
+# Links are checked against a sorted domain blocklist (build it with `python link_screen.py build`)
+BLOCKED_DOMAINS_FILE = os.getenv("BLOCKED_DOMAINS_FILE", "blocked_domains.txt")
+link_screener = LinkScreener(BLOCKED_DOMAINS_FILE)
+
+# Temporary warnings are deleted later by one background task instead of sleeping handlers
+deletion_scheduler = DeletionScheduler()
+
+# Moderation actions run on a fixed pool of workers from bounded per-guild queues
+# (see !pipelinestats); when a guild's queue is full the least important jobs are dropped,
+# but enforcement (deletions, timeouts, role gating) never is
+MODERATION_WORKERS = int(os.getenv("MODERATION_WORKERS", "8"))
+MODERATION_QUEUE_DEPTH = int(os.getenv("MODERATION_QUEUE_DEPTH", "200"))
+moderation_queue = ModerationQueues(workers=MODERATION_WORKERS, max_depth=MODERATION_QUEUE_DEPTH)
+
+# Mod-log events are batched per server: one message every MOD_LOG_FLUSH_SECONDS,
+# or sooner once MOD_LOG_BATCH_SIZE events are waiting
+MOD_LOG_FLUSH_SECONDS = float(os.getenv("MOD_LOG_FLUSH_SECONDS", "5"))
+MOD_LOG_BATCH_SIZE = int(os.getenv("MOD_LOG_BATCH_SIZE", "10"))
+mod_log_sink = ModLogSink(
+    lambda guild: guild_index.text_channel(guild, "mod-logs"),
+    flush_interval=MOD_LOG_FLUSH_SECONDS,
+    max_events=MOD_LOG_BATCH_SIZE
+)
+
+# How often to look for changes to the wordlist files (in seconds)
+WORDLIST_CHECK_INTERVAL = 30
+
+# Channel sweeps
+SWEEP_MAX_MESSAGES = 10000
+SWEEP_PAGE_SIZE = 100  # Messages fetched and checked at a time (also the bulk delete limit)
 
 # Setup bot intents
 intents = discord.Intents.all()
@@ -107,16 +186,32 @@ def setup_persistent_views(bot):
     bot.add_view(TicketControlView())
 
 # Load protected user IDs and channel restrictions from environment
-PROTECTED_USER_ID = os.getenv("PROTECTED_USER_ID", "758954115765239820")  # Owner ID
-BOT_USER_ID = "1370707409433264180"  # Bot ID
-PROTECTED_USER_IDS = [PROTECTED_USER_ID, BOT_USER_ID]  # List of all protected users
+PROTECTED_USER_ID = int(os.getenv("PROTECTED_USER_ID", "758954115765239820"))  # Owner ID
+BOT_USER_ID = 1370707409433264180  # Bot ID
+PROTECTED_USER_IDS = [PROTECTED_USER_ID, BOT_USER_ID]  # Protected in every server
+# Users each server protects on top of those (see !protect)
+PROTECTED_USERS_FILE = "protected_users.json"
+protected_users = ProtectedUsers(PROTECTED_USER_IDS, path=PROTECTED_USERS_FILE)
 RESTRICTED_CHANNEL_IDS_STR = os.getenv("RESTRICTED_CHANNEL_IDS", "1370710306619129976,1370805706223255654")
 RESTRICTED_CHANNEL_IDS = [int(channel_id) for channel_id in RESTRICTED_CHANNEL_IDS_STR.split(",") if channel_id]
 ADMIN_ONLY_CHANNEL_IDS = [1370805706223255654]  # Admin-only channels
 ADMIN_ONLY_CATEGORY_IDS = [1370808706207322214]  # Admin-only categories
-WELCOME_CHANNEL_ID = int(os.getenv("WELCOME_CHANNEL_ID", "1370648731434745926"))
+WELCOME_CHANNEL_ID = int(os.getenv("WELCOME_CHANNEL_ID", "1370648731434745926"))  # Channel for greeting new members
+
+# The settings above compiled into one record per channel (kept current by the channel events)
+channel_policies = ChannelPolicyIndex(
+    restricted_channel_ids=RESTRICTED_CHANNEL_IDS,
+    admin_channel_ids=ADMIN_ONLY_CHANNEL_IDS,
+    admin_category_ids=ADMIN_ONLY_CATEGORY_IDS,
+    welcome_channel_ids=[WELCOME_CHANNEL_ID]
+)
 
-user_warnings = {}
+# Channels and roles of every server by name (kept current by the channel and role events)
+guild_index = GuildIndex()
+
+# Strikes per user; a user's strikes are forgotten a day after their last warning
+WARNING_RESET_SECONDS = 86400
+user_warnings = TTLCache(ttl=WARNING_RESET_SECONDS, max_entries=100000)
 # Timeout durations in minutes for each offense level
 timeout_durations = [1, 2, 3, 4, 5]
 
@@ -126,7 +221,6 @@ GAMER_ROLE = "Gamer"
 # Role IDs for verification system
 VERIFIED_ROLE_ID = 1370699624368574486  # Role name: "verified"
 UNVERIFIED_ROLE_ID = 1370711895342059560  # Role name: "unverified"
-WELCOME_CHANNEL_ID = 1370701226546565221  # Channel: verify
 
 # Function to get role either by ID or name
 def get_role_safe(guild, role_id, role_name):
@@ -136,145 +230,12 @@ def get_role_safe(guild, role_id, role_name):
     if role_id is not None:
         role = guild.get_role(role_id)
     
-    # If not found, try by name (exact match)
-    if not role:
-        role = discord.utils.get(guild.roles, name=role_name)
-        
-    # If still not found, try by lowercase name
+    # If not found, try by name (an exact match first, then ignoring case)
     if not role:
-        role = discord.utils.get(guild.roles, name=role_name.lower())
-        
-    # If still not found, try by uppercase name
-    if not role:
-        role = discord.utils.get(guild.roles, name=role_name.upper())
-    
-    # If still not found, try a case-insensitive search
-    if not role:
-        for guild_role in guild.roles:
-            if guild_role.name.lower() == role_name.lower():
-                role = guild_role
-                break
+        role = guild_index.role(guild, role_name)
         
     return role
 
-# Anti-raid system
-# Tracks recent actions to detect raid attempts
-class AntiRaidSystem:
-    def __init__(self):
-        # Store recent joins: {server_id: [(member_id, join_time)]}
-        self.recent_joins = {}
-        
-        # Store recent actions: {server_id: {action_type: [(user_id, timestamp)]}}
-        self.recent_actions = {}
-        
-        # Raid detection thresholds
-        self.join_threshold = 5  # Number of joins in short period to trigger alert
-        self.join_timeframe = 10  # Timeframe in seconds to monitor joins
-        
-        # Message spam thresholds
-        self.message_threshold = 8  # Messages from same user in timeframe
-        self.message_timeframe = 5  # Timeframe in seconds
-        
-        # Channel creation/deletion thresholds
-        self.channel_action_threshold = 3  # Number of channel creations/deletions
-        self.channel_action_timeframe = 20  # In seconds
-        
-        # Role action thresholds
-        self.role_action_threshold = 3  # Number of role creations/deletions
-        self.role_action_timeframe = 30  # In seconds
-        
-        # Permissions threshold
-        self.permission_changes_threshold = 5  # Number of permission changes
-        self.permission_timeframe = 15  # In seconds
-        
-        # Ban/kick threshold
-        self.ban_kick_threshold = 4  # Number of bans/kicks
-        self.ban_kick_timeframe = 10  # In seconds
-        
-        # Raid status
-        self.raid_mode = {}  # {server_id: bool}
-
-    def add_join(self, server_id, member_id):
-        """Add a member join event to tracking"""
-        now = datetime.now()
-        
-        if server_id not in self.recent_joins:
-            self.recent_joins[server_id] = []
-        
-        # Add the new join
-        self.recent_joins[server_id].append((member_id, now))
-        
-        # Clean old entries
-        self.recent_joins[server_id] = [
-            (m_id, timestamp) for m_id, timestamp in self.recent_joins[server_id]
-            if (now - timestamp).total_seconds() < self.join_timeframe
-        ]
-        
-        # Check if raid threshold is met
-        return len(self.recent_joins[server_id]) >= self.join_threshold
-    
-    def add_action(self, server_id, action_type, user_id):
-        """Add an action event to tracking and check thresholds"""
-        now = datetime.now()
-        
-        if server_id not in self.recent_actions:
-            self.recent_actions[server_id] = {}
-        
-        if action_type not in self.recent_actions[server_id]:
-            self.recent_actions[server_id][action_type] = []
-        
-        # Add the action
-        self.recent_actions[server_id][action_type].append((user_id, now))
-        
-        # Clean old entries based on action type
-        if action_type == 'message':
-            timeframe = self.message_timeframe
-            threshold = self.message_threshold
-        elif action_type in ['channel_create', 'channel_delete']:
-            timeframe = self.channel_action_timeframe
-            threshold = self.channel_action_threshold
-        elif action_type in ['role_create', 'role_delete', 'role_update']:
-            timeframe = self.role_action_timeframe
-            threshold = self.role_action_threshold
-        elif action_type in ['ban', 'kick']:
-            timeframe = self.ban_kick_timeframe
-            threshold = self.ban_kick_threshold
-        elif action_type == 'permission_update':
-            timeframe = self.permission_timeframe
-            threshold = self.permission_changes_threshold
-        else:
-            timeframe = 30  # Default timeframe
-            threshold = 10  # Default threshold
-        
-        # Clean old entries
-        self.recent_actions[server_id][action_type] = [
-            (u_id, timestamp) for u_id, timestamp in self.recent_actions[server_id][action_type]
-            if (now - timestamp).total_seconds() < timeframe
-        ]
-        
-        # Check if user-specific threshold is met (for message spam)
-        if action_type == 'message':
-            user_actions = [
-                u_id for u_id, _ in self.recent_actions[server_id][action_type]
-                if u_id == user_id
-            ]
-            return len(user_actions) >= threshold
-        
-        # Check if general threshold is met
-        return len(self.recent_actions[server_id][action_type]) >= threshold
-    
-    def enable_raid_mode(self, server_id):
-        """Enable raid mode for a server"""
-        self.raid_mode[server_id] = True
-    
-    def disable_raid_mode(self, server_id):
-        """Disable raid mode for a server"""
-        self.raid_mode[server_id] = False
-    
-    def is_raid_mode_enabled(self, server_id):
-        """Check if raid mode is enabled for a server"""
-        return self.raid_mode.get(server_id, False)
-
 # Server Backup System
 class ServerBackupSystem:
     def __init__(self):
@@ -549,7 +510,6 @@ jojo_game = {
 UNVERIFIED_ROLE_ID = 1370701226546565221  # ID of the unverified role
 VERIFIED_ROLE_ID = 1370699624368574486  # ID of the verified role
 VERIFICATION_CHANNEL_ID = None  # This will be set dynamically
-WELCOME_CHANNEL_ID = 1370648731434745926  # Channel for greeting new members
 
 @bot.event
 async def on_ready():
@@ -565,10 +525,20 @@ async def on_ready():
     # Register persistent views for button interactions
     setup_persistent_views(bot)
     
+    # Pick up wordlist file changes without a restart
+    if not watch_wordlists.is_running():
+        watch_wordlists.start()
+    
+    # Index the channel policies, channels and roles of every server
+    for guild in bot.guilds:
+        channel_policies.index_guild(guild)
+        guild_index.index_guild(guild)
+    logger.info(f"Indexed {len(channel_policies)} channels with policies in {len(guild_index)} servers")
+    
     # Find verification channel for global reference
     global VERIFICATION_CHANNEL_ID
     for guild in bot.guilds:
-        verification_channel = discord.utils.get(guild.text_channels, name="verification")
+        verification_channel = guild_index.text_channel(guild, "verification")
         if verification_channel:
             VERIFICATION_CHANNEL_ID = verification_channel.id
             logger.info(f"Verification channel found: {verification_channel.name} (ID: {verification_channel.id})")
@@ -604,7 +574,7 @@ async def on_ready():
                     logger.warning(f"Could not find role with ID {role_id}")
                     
                     # Try to find by name directly
-                    name_role = discord.utils.get(guild.roles, name="Unverified")
+                    name_role = guild_index.role(guild, "Unverified", exact=True)
                     if name_role:
                         logger.info(f"Found role by name: {name_role.name} (ID: {name_role.id})")
                         unverified_role = name_role
@@ -663,15 +633,13 @@ async def on_member_join(member):
         # Notify administrators
         try:
             # Try to notify in a mod-log channel first
-            mod_log = discord.utils.get(member.guild.text_channels, name="mod-logs")
-            if mod_log:
-                raid_alert = discord.Embed(
-                    title="🚨 RAID ALERT 🚨",
-                    description=f"Suspicious number of members joining in a short time. Raid mode has been enabled.",
-                    color=0xff0000
-                )
-                raid_alert.add_field(name="Action", value="New joins will be automatically monitored. Consider locking down the server.")
-                await mod_log.send(embed=raid_alert)
+            raid_alert = discord.Embed(
+                title="🚨 RAID ALERT 🚨",
+                description=f"Suspicious number of members joining in a short time. Raid mode has been enabled.",
+                color=0xff0000
+            )
+            raid_alert.add_field(name="Action", value="New joins will be automatically monitored. Consider locking down the server.")
+            mod_log_sink.log(member.guild, raid_alert)
             
             # Also notify server owner
             owner = member.guild.owner
@@ -680,7 +648,12 @@ async def on_member_join(member):
         except Exception as e:
             logger.error(f"Failed to send raid alert: {e}")
     
-    # Assign unverified role with improved handling
+    # Gating the new member comes first; the welcome messages are dropped first when a raid floods the queue
+    moderation_queue.submit(member.guild.id, PRIORITY_ENFORCE, assign_unverified_role, member)
+    moderation_queue.submit(member.guild.id, PRIORITY_COSMETIC, welcome_member, member)
+
+async def assign_unverified_role(member):
+    """Give a new member the unverified role"""
     try:
         unverified_role = get_role_safe(member.guild, UNVERIFIED_ROLE_ID, "unverified")
         if unverified_role:
@@ -701,7 +674,9 @@ async def on_member_join(member):
             logger.error(f"Could not find unverified role for user {member.name}, roles: {[r.name for r in member.guild.roles]}")
     except Exception as e:
         logger.error(f"Failed in unverified role assignment for {member.name}: {e}")
-    
+
+async def welcome_member(member):
+    """DM a new member and greet them in the verification and welcome channels"""
     # Get a random JoJo quote for the welcome message
     quote = get_random_jojo_quote()
     
@@ -724,9 +699,10 @@ async def on_member_join(member):
         # Send message to verification channel
         verification_channel = member.guild.get_channel(VERIFICATION_CHANNEL_ID)
         if verification_channel:
-            await verification_channel.send(
-                f"ゴゴゴゴ A new stand user, {member.mention}, has appeared! Type `!verify` to verify yourself. ゴゴゴゴ",
-                delete_after=300  # Delete after 5 minutes
+            await send_temporary(
+                verification_channel,
+                300,  # Delete after 5 minutes
+                f"ゴゴゴゴ A new stand user, {member.mention}, has appeared! Type `!verify` to verify yourself. ゴゴゴゴ"
             )
         
         # Send welcome message with GIF to the welcome channel
@@ -748,14 +724,239 @@ async def on_member_join(member):
         logger.error(f"Error sending welcome message: {e}")
 
 # Use a more robust system to track processed commands
-# This includes a timestamp to automatically expire old entries
-processed_commands = {}
+# Entries expire on their own, oldest first, so nothing has to sweep the whole store
 COMMAND_EXPIRATION = 60  # Commands expire after 60 seconds
+MAX_PROCESSED_COMMANDS = 10000
+processed_commands = TTLCache(ttl=COMMAND_EXPIRATION, max_entries=MAX_PROCESSED_COMMANDS)
 
 # Create a lock file to ensure we're not competing with other instances
 INSTANCE_ID = random.randint(1, 10000)
 logger.info(f"Bot instance started with ID: {INSTANCE_ID}")
 
+# The last messages of each channel, so spam cleanup doesn't have to fetch the history
+RECENT_MESSAGES_PER_CHANNEL = int(os.getenv("RECENT_MESSAGES_PER_CHANNEL", "50"))
+RECENT_MESSAGE_CHANNELS = int(os.getenv("RECENT_MESSAGE_CHANNELS", "100"))  # Per server
+recent_messages = RecentMessages(per_channel=RECENT_MESSAGES_PER_CHANNEL, max_channels=RECENT_MESSAGE_CHANNELS)
+
+# Message checks run as a pipeline of stages, cheapest first (see !pipelinestats)
+message_pipeline = MessagePipeline()
+
+def reply_ping_target(message):
+    """Return the author of the message this one replies to, if the reply pings them"""
+    reference = message.reference
+    if reference is None or not isinstance(reference.resolved, discord.Message):
+        return None
+    # Replying to the bot (answering !jojoquiz, say) pings it by default; only people are protected that way
+    if reference.resolved.author.bot:
+        return None
+    author_id = reference.resolved.author.id
+    # A reply only pings when its author left the mention on
+    if any(user.id == author_id for user in message.mentions):
+        return author_id
+    return None
+
+def check_protected_ping(message):
+    """Return the protected user a message pings (in its text or by replying), if any"""
+    guild_id = message.guild.id if message.guild else None
+    return protected_users.pinged(guild_id, message.raw_mentions, reply_ping_target(message))
+
+def guild_key(message):
+    return message.guild.id if message.guild else None
+
+async def send_temporary(channel, delay, content=None, embed=None):
+    """Send a message to a channel and delete it after delay seconds"""
+    sent = await channel.send(content, embed=embed)
+    deletion_scheduler.schedule(sent, delay)
+
+async def warn_author(message, dm_text, channel_text, delay):
+    """DM the author a warning, or post a temporary one in the channel if their DMs are closed"""
+    try:
+        await message.author.send(dm_text)
+    except discord.Forbidden:
+        await send_temporary(message.channel, delay, channel_text)
+
+async def timeout_member(member, minutes, reason):
+    await member.timeout(datetime.now() + timedelta(minutes=minutes), reason=reason)
+
+def delete_and_warn(message, dm_text, channel_text, delay):
+    """Queue the deletion of a message and a warning for its author"""
+    guild_id = guild_key(message)
+    moderation_queue.submit(guild_id, PRIORITY_ENFORCE, message.delete, name="delete_message")
+    if dm_text:
+        moderation_queue.submit(guild_id, PRIORITY_NOTIFY, warn_author, message, dm_text, channel_text, delay)
+    else:
+        moderation_queue.submit(guild_id, PRIORITY_NOTIFY, send_temporary, message.channel, delay, channel_text)
+
+async def handle_protected_ping(message, user_id):
+    """Delete a message that pings a protected user and warn the author"""
+    # Determine the warning message based on which protected user was pinged
+    if user_id == BOT_USER_ID:
+        warning_text = "Please don't ping the bot. If you need help, use the !help command."
+    else:
+        warning_text = "Please don't ping this user. They are busy and will respond when available."
+    
+    # Warn by DM, or with a message in the channel deleted after 5 seconds if DMs are disabled
+    delete_and_warn(message, f"⚠️ **Warning**: {warning_text}", f"{message.author.mention}, {warning_text}", 5)
+
+def handle_restricted_channel(message):
+    delete_and_warn(message, None, f"{message.author.mention}, chatting is not allowed in this channel.", 3)
+
+def is_guild_admin(member):
+    return member.guild_permissions.administrator if hasattr(member, 'guild_permissions') else False
+
+def handle_admin_channel(message):
+    delete_and_warn(
+        message,
+        "⚠️ **Warning**: You cannot post in the admin-only channel. This channel is restricted to server administrators.",
+        f"{message.author.mention}, this is an admin-only channel.",
+        5
+    )
+
+def handle_admin_category(message):
+    delete_and_warn(
+        message,
+        "⚠️ **Warning**: You cannot post in this ticket category. Only server administrators can access this area.",
+        f"{message.author.mention}, this category is restricted to administrators.",
+        5
+    )
+
+# Allow welcome channel but only for greeting, no other messages
+WELCOME_KEYWORDS = ["welcome", "greet", "hello", "hi", "hey", "join", "glad", "happy"]
+
+def handle_welcome_channel(message):
+    delete_and_warn(message, None, f"{message.author.mention}, only welcome messages are allowed in this channel.", 3)
+
+def check_channel_policy(message):
+    """Return the handler for a message its channel doesn't allow, or None"""
+    if not message.guild:
+        return None
+    policy = channel_policies.get(message.channel)
+    if policy is None:
+        return None
+    is_command = message.content.startswith('!')
+    # Chat (not commands) in a channel where chatting isn't allowed
+    if policy.restricted and not is_command:
+        return handle_restricted_channel
+    # A non-admin posting in an admin-only channel or category
+    if policy.admin_channel and not is_guild_admin(message.author):
+        return handle_admin_channel
+    if policy.admin_category and not is_guild_admin(message.author):
+        return handle_admin_category
+    # Anything but a greeting or a command in the welcome channel
+    if policy.welcome and not is_command:
+        content = message.content.lower()
+        if not any(keyword in content for keyword in WELCOME_KEYWORDS):
+            return handle_welcome_channel
+    return None
+
+async def handle_channel_policy(message, handler):
+    handler(message)
+
+def check_duplicate_command(message):
+    """
+    Record a command and return True if it was already processed recently
+    (e.g. by a previous instance of the bot before a restart).
+    """
+    if not message.content.startswith('!') or len(message.content) <= 1:
+        return False
+    # Create a unique identifier for this message
+    message_id = f"{message.id}_{message.channel.id}_{message.author.id}"
+    
+    # Check if we've seen this command in the last 60 seconds (in case of restart)
+    if message_id in processed_commands:
+        return True
+        
+    processed_commands[message_id] = True
+    logger.info(f"Processing command: {message.content} (Instance {INSTANCE_ID})")
+    return False
+
+async def handle_duplicate_command(message, _):
+    logger.info(f"Skipping duplicate command: {message.content}")
+
+def check_spam(message):
+    """Track the message for anti-spam/raid detection; True if its author is spamming (admins are exempt)"""
+    if not message.guild:
+        return False
+    spam_detected = anti_raid.add_action(message.guild.id, 'message', message.author.id)
+    return spam_detected and not message.author.guild_permissions.administrator
+
+async def delete_recent_messages(message):
+    """Delete some of the author's recent messages in the channel (from the recent-message buffer, no history fetch)"""
+    message_ids = recent_messages.recent_by(
+        message.guild.id, message.channel.id, message.author.id,
+        limit=10,  # Delete up to 10 recent messages
+        max_age=BULK_DELETE_MAX_AGE
+    )
+    
+    if message_ids:
+        recent_messages.discard(message.guild.id, message.channel.id, message_ids)
+        await message.channel.delete_messages([discord.Object(id=message_id) for message_id in message_ids])
+
+async def handle_spam(message, _):
+    guild_id = message.guild.id
+    # Timeout the user
+    timeout_duration = 5  # minutes
+    moderation_queue.submit(guild_id, PRIORITY_ENFORCE, timeout_member, message.author, timeout_duration, "Message spam detected")
+    
+    # Delete some of their recent messages
+    moderation_queue.submit(guild_id, PRIORITY_ENFORCE, delete_recent_messages, message)
+    
+    # Notify about spam
+    embed = discord.Embed(
+        title="⚠️ Anti-Spam Protection",
+        description=f"{message.author.mention} has been temporarily muted for message spam.",
+        color=0xff9900
+    )
+    embed.add_field(name="Duration", value=f"{timeout_duration} minutes")
+    embed.add_field(name="Action", value="Some recent messages have been deleted.")
+    moderation_queue.submit(guild_id, PRIORITY_COSMETIC, send_temporary, message.channel, 10, None, embed)
+    
+    # Log this action to mod logs
+    log_embed = discord.Embed(
+        title="🛡️ Anti-Spam Action",
+        description=f"User {message.author.mention} was automatically muted for message spam.",
+        color=0xff9900
+    )
+    mod_log_sink.log(message.guild, log_embed)
+
+def is_checked_content(message):
+    """Messages the content filters look at"""
+    return message.content and not message.author.bot and message.guild
+
+def check_malicious_links(message):
+    # Links are checked on the raw text (folding lookalikes would change the domains)
+    return is_checked_content(message) and link_screener.is_malicious(message.content)
+
+async def handle_malicious_links(message, _):
+    # Handle as a more severe profanity violation (auto timeout)
+    moderation_queue.submit(message.guild.id, PRIORITY_ENFORCE, handle_malicious_content, message)
+
+def check_content(message):
+    """Return "profanity" or "toxic" for a message the filters flag, or None"""
+    if not is_checked_content(message):
+        return None
+    # Copies of content we already checked reuse the verdict
+    verdict_key = profanity_filter.verdict_key(message.content, message.guild.id)
+    verdict = verdict_cache.get(verdict_key)
+    if verdict is None:
+        # Normalize once; every check below reads the same normalized text
+        normalized = profanity_filter.normalize(message.content)
+        verdict = check_message_content(normalized, message.guild.id)
+        verdict_cache.put(verdict_key, verdict)
+        # Compare the candidate engine on some of the content we actually checked
+        shadow_mode.observe(message.content, message.guild.id)
+    return verdict if verdict in ("profanity", "toxic") else None
+
+async def handle_flagged_content(message, verdict):
+    moderation_queue.submit(message.guild.id, PRIORITY_ENFORCE, handle_profanity, message)
+
+message_pipeline.add_stage("protected_ping", check_protected_ping, handle_protected_ping)
+message_pipeline.add_stage("channel_policy", check_channel_policy, handle_channel_policy)
+message_pipeline.add_stage("duplicate_command", check_duplicate_command, handle_duplicate_command)
+message_pipeline.add_stage("spam", check_spam, handle_spam)
+message_pipeline.add_stage("malicious_links", check_malicious_links, handle_malicious_links)
+message_pipeline.add_stage("content", check_content, handle_flagged_content)
+
 @bot.event
 async def on_message(message):
     """Handle message events for profanity filtering and command processing"""
@@ -763,210 +964,49 @@ async def on_message(message):
     if message.author == bot.user:
         return
     
-    # Check if message contains a ping to any protected user
-    for user_id in PROTECTED_USER_IDS:
-        if f"<@{user_id}>" in message.content or f"<@!{user_id}>" in message.content:
-            # Send warning and delete the message
-            try:
-                # Determine the warning message based on which protected user was pinged
-                if user_id == BOT_USER_ID:
-                    warning_text = "Please don't ping the bot. If you need help, use the !help command."
-                else:
-                    warning_text = "Please don't ping this user. They are busy and will respond when available."
-                
-                # Delete the message first
-                await message.delete()
-                
-                # Send ephemeral (private) warning to the user who pinged
-                try:
-                    # Try to use a slash command response if possible (most ephemeral)
-                    await message.author.send(f"⚠️ **Warning**: {warning_text}")
-                except discord.Forbidden:
-                    # If DMs are disabled, send a temporary message in the channel
-                    warning_msg = await message.channel.send(f"{message.author.mention}, {warning_text}")
-                    # Delete warning message after 5 seconds
-                    await asyncio.sleep(5)
-                    await warning_msg.delete()
-                return
-            except Exception as e:
-                logger.error(f"Error handling protected user ping: {e}")
-    
-    # Check if message is in a restricted channel (not allowed to chat)
-    if message.guild and message.channel.id in RESTRICTED_CHANNEL_IDS:
-        # If it's not a command (regular chat message)
-        if not message.content.startswith('!'):
-            try:
-                await message.delete()
-                warning_msg = await message.channel.send(f"{message.author.mention}, chatting is not allowed in this channel.")
-                await asyncio.sleep(3)
-                await warning_msg.delete()
-                return
-            except Exception as e:
-                logger.error(f"Error handling message in restricted channel: {e}")
-    
-    # Check if message is in an admin-only channel
-    if message.guild and message.channel.id in ADMIN_ONLY_CHANNEL_IDS:
-        # Check if user is not an admin
-        is_admin = message.author.guild_permissions.administrator if hasattr(message.author, 'guild_permissions') else False
-        
-        if not is_admin:
-            try:
-                await message.delete()
-                # Send a DM to the user
-                try:
-                    await message.author.send(f"⚠️ **Warning**: You cannot post in the admin-only channel. This channel is restricted to server administrators.")
-                except discord.Forbidden:
-                    # If DMs are disabled, send a temporary message in the channel
-                    warning_msg = await message.channel.send(f"{message.author.mention}, this is an admin-only channel.")
-                    await asyncio.sleep(5)
-                    await warning_msg.delete()
-                return
-            except Exception as e:
-                logger.error(f"Error handling admin-only channel message: {e}")
-    
-    # Check if message is in an admin-only category
-    if message.guild and message.channel.category_id in ADMIN_ONLY_CATEGORY_IDS:
-        # Check if user is not an admin
-        is_admin = message.author.guild_permissions.administrator if hasattr(message.author, 'guild_permissions') else False
-        
-        if not is_admin:
-            try:
-                await message.delete()
-                # Send a DM to the user
-                try:
-                    await message.author.send(f"⚠️ **Warning**: You cannot post in this ticket category. Only server administrators can access this area.")
-                except discord.Forbidden:
-                    # If DMs are disabled, send a temporary message in the channel
-                    warning_msg = await message.channel.send(f"{message.author.mention}, this category is restricted to administrators.")
-                    await asyncio.sleep(5)
-                    await warning_msg.delete()
-                return
-            except Exception as e:
-                logger.error(f"Error handling admin-only category message: {e}")
-    
-    # Allow welcome channel but only for greeting, no other messages
-    if message.guild and message.channel.id == WELCOME_CHANNEL_ID:
-        # Check if message contains welcome-related keywords
-        welcome_keywords = ["welcome", "greet", "hello", "hi", "hey", "join", "glad", "happy"]
-        is_welcome_message = any(keyword in message.content.lower() for keyword in welcome_keywords)
-        
-        # If not a welcome message or command, delete it
-        if not is_welcome_message and not message.content.startswith('!'):
-            try:
-                await message.delete()
-                warning_msg = await message.channel.send(f"{message.author.mention}, only welcome messages are allowed in this channel.")
-                await asyncio.sleep(3)
-                await warning_msg.delete()
-                return
-            except Exception as e:
-                logger.error(f"Error handling non-welcome message: {e}")
-    
-    # Check if this is a command
-    if message.content.startswith('!') and len(message.content) > 1:
-        # Create a unique identifier for this message
-        message_id = f"{message.id}_{message.channel.id}_{message.author.id}"
-        
-        # Check if we've seen this command already
-        current_time = datetime.now().timestamp()
-        if message_id in processed_commands:
-            stored_time = processed_commands[message_id]
-            # Only process if it's been more than 60 seconds (in case of restart)
-            if current_time - stored_time < COMMAND_EXPIRATION:
-                logger.info(f"Skipping duplicate command: {message.content}")
-                return
-                
-        # Clean up expired commands
-        expired_keys = [k for k, v in processed_commands.items() 
-                        if current_time - v > COMMAND_EXPIRATION]
-        for k in expired_keys:
-            processed_commands.pop(k, None)
-            
-        # Add to processed commands with current timestamp
-        processed_commands[message_id] = current_time
-        logger.info(f"Processing command: {message.content} (Instance {INSTANCE_ID})")
-    
+    # Remember it so spam can be cleaned up without fetching the channel history
     if message.guild:
-        # Track message for anti-spam/raid detection (only in guilds, not DMs)
-        spam_detected = anti_raid.add_action(message.guild.id, 'message', message.author.id)
-        
-        # If spam detected and user is not an admin
-        if spam_detected and not message.author.guild_permissions.administrator:
-            try:
-                # Timeout the user
-                timeout_duration = 5  # minutes
-                timeout_until = datetime.now() + timedelta(minutes=timeout_duration)
-                await message.author.timeout(timeout_until, reason="Message spam detected")
-                
-                # Delete some of their recent messages
-                messages_to_delete = []
-                async for msg in message.channel.history(limit=30):
-                    if msg.author.id == message.author.id:
-                        messages_to_delete.append(msg)
-                        if len(messages_to_delete) >= 10:  # Delete up to 10 recent messages
-                            break
-                
-                if messages_to_delete:
-                    await message.channel.delete_messages(messages_to_delete)
-                
-                # Notify about spam
-                embed = discord.Embed(
-                    title="⚠️ Anti-Spam Protection",
-                    description=f"{message.author.mention} has been temporarily muted for message spam.",
-                    color=0xff9900
-                )
-                embed.add_field(name="Duration", value=f"{timeout_duration} minutes")
-                embed.add_field(name="Action", value="Some recent messages have been deleted.")
-                spam_msg = await message.channel.send(embed=embed)
-                await asyncio.sleep(10)
-                await spam_msg.delete()
-                
-                # Log this action to mod logs
-                mod_log = discord.utils.get(message.guild.text_channels, name="mod-logs")
-                if mod_log:
-                    log_embed = discord.Embed(
-                        title="🛡️ Anti-Spam Action",
-                        description=f"User {message.author.mention} was automatically muted for message spam.",
-                        color=0xff9900
-                    )
-                    await mod_log.send(embed=log_embed)
-                    
-                return  # Skip further processing
-            except Exception as e:
-                logger.error(f"Error handling message spam: {e}")
-    
-    # Check for profanity and malicious links
-    if message.content and not message.author.bot and message.guild:
-        # Check for malicious links (scam, porn, etc.)
-        malicious_link_patterns = [
-            r'porn', r'xxx', r'sex', r'adult', r'nude', r'naked',  # Porn links
-            r'free.?nitro', r'discord.?nitro', r'steam.?gift',      # Common Discord scams
-            r'giveaway', r'free.?robux', r'free.?vbucks',           # Common gaming scams
-            r'account.?steal', r'password.?hack', r'login.?info',   # Phishing indicators
-            r'viruslink', r'malware', r'trojan', r'suspicious.?site' # Explicit malware
-        ]
-        
-        for pattern in malicious_link_patterns:
-            if re.search(pattern, message.content.lower()):
-                # Handle as a more severe profanity violation (auto timeout)
-                await handle_malicious_content(message)
-                return
-        
-        # Check if message contains profanity
-        if profanity_filter.contains_profanity(message.content):
-            await handle_profanity(message)
-            return
+        recent_messages.record(message)
+    
+    # Stop at the first stage that deletes or otherwise handles the message
+    if await message_pipeline.run(message):
+        return
     
     # Process commands
     await bot.process_commands(message)
 
+@bot.event
+async def on_raw_message_delete(payload):
+    if payload.guild_id:
+        recent_messages.discard(payload.guild_id, payload.channel_id, (payload.message_id,))
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    if payload.guild_id:
+        recent_messages.discard(payload.guild_id, payload.channel_id, payload.message_ids)
+
+def check_message_content(normalized, guild_id):
+    """
+    Run the content checks on a normalized message (links are checked before this).
+    Returns "profanity", "toxic" or "clean".
+    """
+    # Check if message contains profanity
+    if profanity_filter.contains_profanity(normalized, guild_id=guild_id):
+        return "profanity"
+    
+    # Messages the wordlists let through go to the classifier, if one is loaded
+    if toxicity_scorer and toxicity_scorer.score(normalized) >= TOXICITY_THRESHOLD:
+        return "toxic"
+    
+    return "clean"
+
 async def handle_malicious_content(message):
     """Handle messages containing malicious links or content"""
     user_id = message.author.id
     current_time = datetime.now()
     
-    # Initialize user in warning system if not exists
-    if user_id not in user_warnings:
-        user_warnings[user_id] = {'count': 0, 'last_warning': None}
+    # Initialize user in warning system if not exists (setting it also restarts its expiry)
+    user_warnings[user_id] = user_warnings.get(user_id) or {'count': 0, 'last_warning': None}
     
     # Set warning count to at least 3 for malicious content (harsher punishment)
     user_warnings[user_id]['count'] = max(3, user_warnings[user_id]['count'] + 2)
@@ -1014,26 +1054,17 @@ async def handle_malicious_content(message):
         except Exception as e:
             logger.error(f"Error applying timeout: {e}")
         
-        # Send warning message
-        warning_message = await message.channel.send(embed=embed)
+        # Send warning message, deleted after 15 seconds (longer than regular profanity)
+        moderation_queue.submit(message.guild.id, PRIORITY_COSMETIC, send_temporary, message.channel, 15, None, embed)
         
         # Notify moderators
-        try:
-            mod_channel = discord.utils.get(message.guild.text_channels, name="mod-logs")
-            if mod_channel:
-                mod_embed = discord.Embed(
-                    title="🚨 Malicious Content Alert",
-                    description=f"User {message.author.mention} posted potentially harmful content.",
-                    color=0xff0000
-                )
-                mod_embed.add_field(name="Action Taken", value=f"Message deleted and user timed out for {timeout_minutes} minutes.")
-                await mod_channel.send(embed=mod_embed)
-        except Exception as e:
-            logger.error(f"Failed to notify moderators: {e}")
-        
-        # Delete the warning after 15 seconds (longer than regular profanity)
-        await asyncio.sleep(15)
-        await warning_message.delete()
+        mod_embed = discord.Embed(
+            title="🚨 Malicious Content Alert",
+            description=f"User {message.author.mention} posted potentially harmful content.",
+            color=0xff0000
+        )
+        mod_embed.add_field(name="Action Taken", value=f"Message deleted and user timed out for {timeout_minutes} minutes.")
+        mod_log_sink.log(message.guild, mod_embed)
         
     except discord.Forbidden:
         logger.error(f"Failed to delete message from {message.author.name} - insufficient permissions")
@@ -1045,16 +1076,10 @@ async def handle_profanity(message):
     user_id = message.author.id
     current_time = datetime.now()
     
-    # Initialize user in warning system if not exists
-    if user_id not in user_warnings:
-        user_warnings[user_id] = {'count': 0, 'last_warning': None}
-    
-    # Reset warning count if last warning was more than 24 hours ago
-    if (user_warnings[user_id]['last_warning'] and 
-        (current_time - user_warnings[user_id]['last_warning']).total_seconds() > 86400):
-        user_warnings[user_id]['count'] = 0
+    # Initialize user in warning system if not exists (setting it also restarts its expiry)
+    user_warnings[user_id] = user_warnings.get(user_id) or {'count': 0, 'last_warning': None}
     
-    # Increment warning count
+    # Increment warning count (the count resets once a day passes without a warning)
     user_warnings[user_id]['count'] += 1
     user_warnings[user_id]['last_warning'] = current_time
     
@@ -1097,11 +1122,8 @@ async def handle_profanity(message):
             except Exception as e:
                 logger.error(f"Error applying timeout: {e}")
         
-        # Send warning message
-        warning_message = await message.channel.send(embed=embed)
-        # Delete the warning after 10 seconds
-        await asyncio.sleep(10)
-        await warning_message.delete()
+        # Send warning message, deleted after 10 seconds
+        moderation_queue.submit(message.guild.id, PRIORITY_COSMETIC, send_temporary, message.channel, 10, None, embed)
         
     except discord.Forbidden:
         logger.error(f"Failed to delete message from {message.author.name} - insufficient permissions")
@@ -1276,8 +1298,7 @@ async def clear(ctx, amount: int = 5):
         
         # Send temporary confirmation
         msg = await ctx.send(f"🧹 Deleted {len(deleted) - 1} messages.")
-        await asyncio.sleep(3)
-        await msg.delete()
+        deletion_scheduler.schedule(msg, 3)
         
         logger.info(f"Cleared {len(deleted) - 1} messages in {ctx.channel.name}")
     
@@ -1287,6 +1308,114 @@ async def clear(ctx, amount: int = 5):
         await ctx.send(f"Failed to delete messages: {e}")
         logger.error(f"Error clearing messages: {e}")
 
+@bot.command(name="sweep")
+@commands.has_permissions(manage_messages=True)
+async def sweep(ctx, limit: int = 1000):
+    """Check past messages in this channel and delete the ones with profanity"""
+    if limit < 1 or limit > SWEEP_MAX_MESSAGES:
+        await ctx.send(f"Please choose between 1 and {SWEEP_MAX_MESSAGES} messages.")
+        return
+    
+    status_msg = await ctx.send(f"🧹 Sweeping the last {limit} messages...")
+    start_time = time.perf_counter()
+    scan_seconds = 0.0
+    scanned = 0
+    flagged = 0
+    deleted = 0
+    
+    # Deletes run alongside the history fetch; None tells the deleter to stop
+    delete_queue = asyncio.Queue()
+    bulk_cutoff = discord.utils.utcnow() - timedelta(days=14)
+    
+    async def delete_worker():
+        nonlocal deleted
+        while True:
+            batch = await delete_queue.get()
+            if batch is None:
+                return
+            # Bulk delete only works on messages younger than 14 days
+            recent = [msg for msg in batch if msg.created_at > bulk_cutoff]
+            old = [msg for msg in batch if msg.created_at <= bulk_cutoff]
+            if len(recent) == 1:
+                old.extend(recent)
+            elif recent:
+                try:
+                    await ctx.channel.delete_messages(recent)
+                    deleted += len(recent)
+                except discord.HTTPException as e:
+                    # Fall back to deleting them one by one below
+                    logger.error(f"Error bulk deleting swept messages: {e}")
+                    old.extend(recent)
+            # One failed deletion doesn't stop the rest of the batch
+            for msg in old:
+                try:
+                    await msg.delete()
+                    deleted += 1
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException as e:
+                    logger.error(f"Error deleting swept message {msg.id}: {e}")
+    
+    async def check_page(page):
+        nonlocal scan_seconds, scanned, flagged
+        texts = [msg.content for msg in page]
+        page_start = time.perf_counter()
+        if SWEEP_PROCESSES > 0:
+            # Waiting on the worker processes happens off the event loop
+            results = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: list(profanity_filter.scan_batch(texts, ctx.guild.id, processes=SWEEP_PROCESSES))
+            )
+        else:
+            results = list(profanity_filter.scan_batch(texts, ctx.guild.id))
+        if toxicity_scorer:
+            # Score everything the wordlists let through in one batch
+            passed = [index for index, profane in enumerate(results) if not profane]
+            scores = toxicity_scorer.score_batch([texts[index] for index in passed])
+            for index, score in zip(passed, scores):
+                results[index] = score >= TOXICITY_THRESHOLD
+        scan_seconds += time.perf_counter() - page_start
+        scanned += len(page)
+        to_delete = [msg for msg, profane in zip(page, results) if profane]
+        if to_delete:
+            flagged += len(to_delete)
+            await delete_queue.put(to_delete)
+    
+    deleter = asyncio.create_task(delete_worker())
+    try:
+        page = []
+        async for msg in ctx.channel.history(limit=limit, before=ctx.message):
+            if msg.author.bot or msg.pinned or not msg.content:
+                continue
+            page.append(msg)
+            if len(page) >= SWEEP_PAGE_SIZE:
+                await check_page(page)
+                page = []
+        if page:
+            await check_page(page)
+    except discord.Forbidden:
+        await ctx.send("I don't have permission to read this channel's history.")
+    finally:
+        await delete_queue.put(None)
+        await deleter
+    
+    elapsed = time.perf_counter() - start_time
+    embed = discord.Embed(
+        title="🧹 Sweep Complete",
+        color=0x00ff00
+    )
+    embed.add_field(name="Checked", value=str(scanned))
+    embed.add_field(name="Flagged", value=str(flagged))
+    embed.add_field(name="Deleted", value=str(deleted))
+    embed.add_field(
+        name="Throughput",
+        value=f"{scanned / scan_seconds if scan_seconds else 0:,.0f} messages/s checked\n"
+              f"{scanned / elapsed if elapsed else 0:,.0f} messages/s overall ({elapsed:.1f}s)",
+        inline=False
+    )
+    await status_msg.edit(content=None, embed=embed)
+    logger.info(f"Swept {scanned} messages in {ctx.channel.name}: {flagged} flagged, {deleted} deleted")
+
 @bot.command(name="scan")
 async def scan(ctx, *, text=None):
     """Scan and analyze text using a JoJo-themed response"""
@@ -1344,7 +1473,7 @@ async def hello(ctx):
 @bot.command(name="assign")
 async def assign(ctx):
     """Assign the Gamer role to the user"""
-    role = discord.utils.get(ctx.guild.roles, name=GAMER_ROLE)
+    role = guild_index.role(ctx.guild, GAMER_ROLE, exact=True)
     if role:
         if role in ctx.author.roles:
             await ctx.send(f"You already have the {GAMER_ROLE} role, {ctx.author.mention}!")
@@ -1365,7 +1494,7 @@ async def assign(ctx):
 @bot.command(name="remove")
 async def remove(ctx):
     """Remove the Gamer role from the user"""
-    role = discord.utils.get(ctx.guild.roles, name=GAMER_ROLE)
+    role = guild_index.role(ctx.guild, GAMER_ROLE, exact=True)
     if role:
         if role not in ctx.author.roles:
             await ctx.send(f"You don't have the {GAMER_ROLE} role, {ctx.author.mention}!")
@@ -1422,7 +1551,7 @@ async def dm(ctx, member: discord.Member = None, *, msg=None):
                 await ctx.author.send(embed=confirmation_embed)
         except discord.Forbidden:
             # If can't DM the author, send an ephemeral message in the channel
-            confirmation_msg = await ctx.send(f"✅ DM sent to {member.mention}!", delete_after=5)
+            await send_temporary(ctx.channel, 5, f"✅ DM sent to {member.mention}!")
     except discord.Forbidden:
         confirmation_embed.set_footer(text="❌ Failed to deliver message - user has DMs disabled")
         confirmation_embed.color = 0xff0000
@@ -1430,12 +1559,12 @@ async def dm(ctx, member: discord.Member = None, *, msg=None):
             await ctx.author.send(embed=confirmation_embed)
         except:
             # If can't DM the author, send an ephemeral message in the channel
-            await ctx.send(f"❌ I couldn't send a DM to {member.mention}. They may have DMs disabled.", delete_after=5)
+            await send_temporary(ctx.channel, 5, f"❌ I couldn't send a DM to {member.mention}. They may have DMs disabled.")
     except Exception as e:
         try:
             await ctx.author.send(f"Error sending DM: {e}")
         except:
-            await ctx.send(f"Error sending DM: {e}", delete_after=5)
+            await send_temporary(ctx.channel, 5, f"Error sending DM: {e}")
 
 @bot.command(name="massdm")
 @commands.has_permissions(administrator=True)
@@ -1456,7 +1585,7 @@ async def mass_dm(ctx, target=None, *, message=None):
         pass
     
     if not message:
-        await ctx.send("❌ You need to provide a message to send. Usage: `!massdm <target> <message>`", delete_after=10)
+        await send_temporary(ctx.channel, 10, "❌ You need to provide a message to send. Usage: `!massdm <target> <message>`")
         return
     
     # Create a status message
@@ -1494,7 +1623,7 @@ async def mass_dm(ctx, target=None, *, message=None):
     # If target is a role name (without mention)
     else:
         # Try to find role by name
-        role = discord.utils.get(ctx.guild.roles, name=target)
+        role = guild_index.role(ctx.guild, target, exact=True)
         if role:
             members_to_dm = [m for m in ctx.guild.members if role in m.roles]
             target_desc = f"all members with the {role.name} role"
@@ -1812,7 +1941,7 @@ async def verify(ctx):
             await ctx.send(embed=embed)
             
             # Also send a message to the general channel if it exists
-            general_channel = discord.utils.get(ctx.guild.text_channels, name="general")
+            general_channel = guild_index.text_channel(ctx.guild, "general")
             if general_channel:
                 await general_channel.send(f"ゴゴゴゴ A new Stand user, {ctx.author.mention}, has joined the adventure! ゴゴゴゴ")
             
@@ -1838,11 +1967,7 @@ async def verify(ctx):
         # If user is already verified
         await ctx.send("You are already verified or don't need verification!")
         # Delete the message after 5 seconds
-        await asyncio.sleep(5)
-        try:
-            await ctx.message.delete()
-        except:
-            pass
+        deletion_scheduler.schedule(ctx.message, 5)
 
 # Help Command 
 @bot.command(name='help')
@@ -1992,7 +2117,10 @@ async def admin_help(ctx):
               "`ban` - Ban a user from the server\n"
               "`mute` - Timeout a user for a period\n"
               "`unmute` - Remove timeout from a user\n"
-              "`clear` - Delete multiple messages",
+              "`clear` - Delete multiple messages\n"
+              "`sweep [limit]` - Delete past messages with profanity\n"
+              "`filterword add/remove/list` - Manage this server's filter words\n"
+              "`protect add/remove/list` - Manage who can't be pinged in this server",
         inline=False
     )
     
@@ -2003,6 +2131,11 @@ async def admin_help(ctx):
               "`verify_setup` - Set up the verification system\n"
               "`setup_permissions` - Fix permissions for unverified users\n"
               "`ticket_setup` - Set up the ticket system\n"
+              "`filterstats` - Show profanity filter cache stats\n"
+              "`pipelinestats` - Show what each message check costs\n"
+              "`raidstats` - Show what the anti-raid system is tracking\n"
+              "`filterreload` - Reload the profanity wordlist files\n"
+              "`shadowstats` - Compare a candidate filter engine on live traffic\n"
               "`serverbackup` - Create a backup of server configuration\n"
               "`listbackups` - List available server backups\n"
               "`backuprestore <number>` - Restore a server backup",
@@ -2498,6 +2631,272 @@ async def battle(ctx, opponent: discord.Member = None):
     
     await ctx.send(embed=embed)
 
+@bot.command(name="filterword", aliases=["fw"])
+@commands.has_permissions(manage_messages=True)
+async def filter_word(ctx, action: str = None, *, word: str = None):
+    """Add, remove or list this server's profanity filter words"""
+    guild_wordlists = profanity_filter.guild_wordlists
+    
+    if action is None or action.lower() == "list":
+        added = guild_wordlists.added_words(ctx.guild.id)
+        removed = guild_wordlists.removed_words(ctx.guild.id)
+        embed = discord.Embed(
+            title="🧹 Server Filter Words",
+            description="Changes this server made to the shared profanity filter.",
+            color=0x3498db
+        )
+        added_text = ", ".join(f"||{w}||" for w in added) or "None"
+        removed_text = ", ".join(f"||{w}||" for w in removed) or "None"
+        embed.add_field(name=f"Added ({len(added)})", value=added_text[:1024], inline=False)
+        embed.add_field(name=f"Allowed ({len(removed)})", value=removed_text[:1024], inline=False)
+        embed.set_footer(text="Use !filterword add <word> or !filterword remove <word>")
+        await ctx.send(embed=embed)
+        return
+    
+    if action.lower() not in ["add", "remove"] or not word:
+        await ctx.send("Usage: `!filterword add <word>`, `!filterword remove <word>` or `!filterword list`")
+        return
+    
+    # Don't leave the word sitting in the channel
+    try:
+        await ctx.message.delete()
+    except (discord.Forbidden, discord.NotFound):
+        pass
+    
+    try:
+        if action.lower() == "add":
+            changed = guild_wordlists.add_word(ctx.guild.id, word)
+            result = "is now filtered" if changed else "was already filtered"
+        else:
+            changed = guild_wordlists.remove_word(ctx.guild.id, word)
+            result = "is no longer filtered" if changed else "wasn't filtered"
+    except ValueError as e:
+        # The reason can quote filtered words, so it doesn't stay in the channel either
+        await send_temporary(ctx.channel, 30, f"❌ {e}")
+        return
+    
+    await send_temporary(ctx.channel, 10, f"✅ ||{word}|| {result} in this server.")
+    if changed:
+        logger.info(f"{ctx.author} used filterword {action.lower()} in guild {ctx.guild.id}")
+
+@bot.command(name="protect")
+@commands.has_permissions(administrator=True)
+async def protect(ctx, action: str = None, member: discord.Member = None):
+    """Add, remove or list the users this server doesn't allow pings to"""
+    if action is None or action.lower() == "list":
+        shared = sorted(protected_users.global_ids)
+        added = protected_users.added(ctx.guild.id)
+        embed = discord.Embed(
+            title="🛡️ Protected Users",
+            description="Messages that ping these users (or reply to them with the ping on) are deleted.",
+            color=0x3498db
+        )
+        embed.add_field(name="Everywhere", value=", ".join(f"<@{user_id}>" for user_id in shared) or "None", inline=False)
+        embed.add_field(name=f"This Server ({len(added)})", value=", ".join(f"<@{user_id}>" for user_id in added)[:1024] or "None", inline=False)
+        embed.set_footer(text="Use !protect add @user or !protect remove @user")
+        await ctx.send(embed=embed)
+        return
+    
+    if action.lower() not in ["add", "remove"] or member is None:
+        await ctx.send("Usage: `!protect add @user`, `!protect remove @user` or `!protect list`")
+        return
+    
+    try:
+        if action.lower() == "add":
+            changed = protected_users.add(ctx.guild.id, member.id)
+            result = "is now protected from pings" if changed else "was already protected"
+        else:
+            changed = protected_users.remove(ctx.guild.id, member.id)
+            result = "is no longer protected" if changed else "wasn't protected by this server"
+    except ValueError as e:
+        await ctx.send(f"❌ {e}")
+        return
+    
+    await ctx.send(f"✅ {member.display_name} {result}.")
+
+async def reload_wordlists():
+    """
+    Compile the wordlist files in a worker thread and swap the new version in.
+    Messages keep being checked with the old version until the swap.
+    """
+    loop = asyncio.get_running_loop()
+    compiled = await loop.run_in_executor(None, profanity_filter.compile_wordlists)
+    profanity_filter.swap_wordlists(compiled)
+    return compiled
+
+@tasks.loop(seconds=WORDLIST_CHECK_INTERVAL)
+async def watch_wordlists():
+    """Reload the profanity filter and the domain blocklist when their files change"""
+    if link_screener.blocklist_changed():
+        link_screener.reload_blocklist()
+        logger.info(f"Reloaded domain blocklist {BLOCKED_DOMAINS_FILE}")
+    if not profanity_filter.wordlists_changed():
+        return
+    try:
+        await reload_wordlists()
+    except (OSError, ValueError) as e:
+        # Keep the version in use; the next change gets another try
+        logger.error(f"Error reloading wordlists: {e}")
+
+@bot.command(name="filterreload")
+@commands.has_permissions(administrator=True)
+async def filter_reload(ctx):
+    """Reload the profanity filter wordlists from their files"""
+    try:
+        compiled = await reload_wordlists()
+    except (OSError, ValueError) as e:
+        await ctx.send(f"❌ Couldn't reload the wordlists: {e}")
+        return
+    
+    embed = discord.Embed(
+        title="🔄 Wordlists Reloaded",
+        color=0x00ff00
+    )
+    embed.add_field(name="Version", value=f"{compiled.version} (`{compiled.digest}`)")
+    embed.add_field(name="Entries", value=f"{len(compiled.profanity_words)} profanity\n{len(compiled.harassment_words)} harassment")
+    embed.add_field(name="Compile Time", value=f"{compiled.compile_time * 1000:.0f} ms")
+    await ctx.send(embed=embed)
+
+@bot.command(name="shadowstats")
+@commands.has_permissions(administrator=True)
+async def shadow_stats(ctx):
+    """Summarize how the shadow-mode candidate engine compares to the live one"""
+    if not shadow_mode.running:
+        await ctx.send("Shadow mode is off. Set `SHADOW_ENGINE` (e.g. `regex`) to compare an engine on live traffic.")
+        return
+    
+    summary = shadow_mode.summary()
+    embed = discord.Embed(
+        title="🕵️ Shadow Mode",
+        description=f"Candidate engine `{summary['candidate']}` on {summary['sample_rate']:.1%} of messages",
+        color=0x9966cc
+    )
+    embed.add_field(
+        name="Traffic",
+        value=f"Sampled: {summary['sampled']}\n"
+              f"Compared: {summary['compared']}\n"
+              f"Dropped: {summary['dropped']} | Errors: {summary['errors']}",
+    )
+    embed.add_field(
+        name="Disagreements",
+        value=f"Total: {summary['disagreements']} ({summary['disagreement_rate']:.2%})\n"
+              f"Only live flagged: {summary['primary_only']}\n"
+              f"Only candidate flagged: {summary['candidate_only']}",
+    )
+    for name, label in (("primary", "Live Latency"), ("candidate", "Candidate Latency")):
+        latency = summary['latency_ms'][name]
+        embed.add_field(
+            name=label,
+            value=f"p50 {latency['p50']:.3f} ms\n"
+                  f"p90 {latency['p90']:.3f} ms\n"
+                  f"p99 {latency['p99']:.3f} ms\n"
+                  f"max {latency['max']:.3f} ms",
+            inline=False
+        )
+    recent = shadow_mode.recent_disagreements()
+    if recent:
+        lines = [
+            f"{'live' if record['primary'] else 'candidate'} flagged: ||{record['text'][:80]}||"
+            for record in recent
+        ]
+        embed.add_field(name="Recent Disagreements", value="\n".join(lines)[:1024], inline=False)
+    embed.set_footer(text=f"Full log: {SHADOW_LOG_FILE}")
+    await ctx.send(embed=embed)
+
+@bot.command(name="pipelinestats")
+@commands.has_permissions(administrator=True)
+async def pipeline_stats(ctx):
+    """Show what each on_message stage costs, most CPU first"""
+    embed = discord.Embed(
+        title="⏱️ Message Pipeline",
+        description=f"{message_pipeline.messages} messages, {message_pipeline.passed} passed every stage",
+        color=0x3498db
+    )
+    for row in message_pipeline.summary():
+        embed.add_field(
+            name=f"{row['name']} ({row['cpu_share']:.0%} of check time)",
+            value=f"Calls: {row['calls']} | Acted: {row['acted']} | Errors: {row['errors']}\n"
+                  f"Check: {row['check_mean_us']:.1f} us avg, p99 ≤ {row['check_p99_us']:g} us, "
+                  f"{row['check_total_ms']:.0f} ms total\n"
+                  f"Action: {row['action_mean_ms']:.2f} ms avg",
+            inline=False
+        )
+    dropped = " | ".join(f"{PRIORITY_NAMES[priority]} {count}" for priority, count in moderation_queue.dropped.items())
+    deepest = ", ".join(f"{bot.get_guild(guild_id) or guild_id}: {depth}" for guild_id, depth in moderation_queue.guild_depths(3))
+    embed.add_field(
+        name="Moderation Queue",
+        value=f"Queued: {moderation_queue.depth} (deepest: {deepest or 'none'}) | Running: {moderation_queue.running}\n"
+              f"Peak depth: {moderation_queue.high_water}/{moderation_queue.max_depth} per server | "
+              f"Workers: {moderation_queue.worker_count}\n"
+              f"Completed: {moderation_queue.completed} | Failed: {moderation_queue.failed} | "
+              f"Avg wait: {moderation_queue.mean_wait_ms:.0f} ms\n"
+              f"Dropped: {dropped} | Enforcement queued past the limit: {moderation_queue.overflowed}",
+        inline=False
+    )
+    embed.add_field(
+        name="Mod Log",
+        value=f"Events: {mod_log_sink.logged} | Waiting: {mod_log_sink.pending}\n"
+              f"Messages sent: {mod_log_sink.messages_sent} | Summarized: {mod_log_sink.summarized} "
+              f"(over buffer: {mod_log_sink.overflowed}) | No mod-logs channel: {mod_log_sink.undelivered}",
+        inline=False
+    )
+    embed.set_footer(text="Check time is CPU spent deciding; actions are queued and run by the moderation workers")
+    await ctx.send(embed=embed)
+
+@bot.command(name="filterstats")
+@commands.has_permissions(administrator=True)
+async def filter_stats(ctx):
+    """Show how the profanity filter and its caches are doing"""
+    guild_wordlists = profanity_filter.guild_wordlists
+    embed = discord.Embed(
+        title="📊 Filter Stats",
+        color=0x3498db
+    )
+    compiled = profanity_filter.compiled
+    embed.add_field(
+        name="Wordlists",
+        value=f"Version: {compiled.version} (`{compiled.digest}`)\n"
+              f"Entries: {len(compiled.words)} ({len(compiled.matcher.pruned)} pruned)\n"
+              f"Compile time: {compiled.compile_time * 1000:.0f} ms",
+        inline=False
+    )
+    embed.add_field(
+        name="Verdict Cache",
+        value=f"Entries: {len(verdict_cache)}/{verdict_cache.max_entries}\n"
+              f"Hits: {verdict_cache.hits} | Misses: {verdict_cache.misses}\n"
+              f"Hit rate: {verdict_cache.hit_rate:.1%}\n"
+              f"Evictions: {verdict_cache.evictions}",
+        inline=False
+    )
+    embed.add_field(
+        name="Server Word Lists",
+        value=f"Compiled: {guild_wordlists.compiled_count}/{guild_wordlists.max_compiled}\n"
+              f"Compiles: {guild_wordlists.compiles} | Evictions: {guild_wordlists.evictions}",
+        inline=False
+    )
+    blocklist = link_screener.blocklist
+    blocklist_size = f"{blocklist.size / 1024:.0f} KB" if blocklist and blocklist.size else "none (keywords only)"
+    embed.add_field(
+        name="Link Screen",
+        value=f"Blocklist: {blocklist_size}\n"
+              f"Links checked: {link_screener.links_checked}\n"
+              f"Blocked: {link_screener.blocked} | Keyword hits: {link_screener.keyword_hits}",
+        inline=False
+    )
+    embed.add_field(
+        name="Toxicity Model",
+        value=f"`{TOXICITY_MODEL}` (flags scores from {TOXICITY_THRESHOLD:.2f})" if toxicity_scorer else "Off",
+        inline=False
+    )
+    embed.add_field(
+        name="Scheduled Deletions",
+        value=f"Pending: {deletion_scheduler.pending} | Deleted: {deletion_scheduler.deleted}\n"
+              f"Bulk deletes: {deletion_scheduler.bulk_deletes} | Single: {deletion_scheduler.single_deletes} | "
+              f"Failed: {deletion_scheduler.failed}",
+        inline=False
+    )
+    await ctx.send(embed=embed)
+
 # Error handling for moderation commands
 @kick.error
 @ban.error
@@ -2505,6 +2904,9 @@ async def battle(ctx, opponent: discord.Member = None):
 @unmute.error
 @move.error
 @clear.error
+@sweep.error
+@filter_word.error
+@protect.error
 async def moderation_error(ctx, error):
     """Error handler for moderation commands"""
     if isinstance(error, commands.MissingPermissions):
@@ -2530,7 +2932,10 @@ async def on_guild_channel_create(channel):
     """Monitor channel creation for potential nuking"""
     if not channel.guild:
         return
-        
+    
+    channel_policies.index_channel(channel)
+    guild_index.index_channel(channel)
+    
     # Track channel creation
     nuke_detected = anti_raid.add_action(channel.guild.id, 'channel_create', channel.guild.me.id)
     
@@ -2542,15 +2947,13 @@ async def on_guild_channel_create(channel):
                     # Someone is creating multiple channels rapidly (possible nuke)
                     
                     # Notify admins
-                    mod_log = discord.utils.get(channel.guild.text_channels, name="mod-logs")
-                    if mod_log:
-                        embed = discord.Embed(
-                            title="🚨 NUKE ALERT - Multiple Channels Created",
-                            description=f"User {entry.user.mention} is creating multiple channels rapidly!",
-                            color=0xff0000
-                        )
-                        embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
-                        await mod_log.send(embed=embed)
+                    embed = discord.Embed(
+                        title="🚨 NUKE ALERT - Multiple Channels Created",
+                        description=f"User {entry.user.mention} is creating multiple channels rapidly!",
+                        color=0xff0000
+                    )
+                    embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
+                    mod_log_sink.log(channel.guild, embed)
                     
                     # DM the owner
                     if channel.guild.owner:
@@ -2567,7 +2970,11 @@ async def on_guild_channel_delete(channel):
     """Monitor channel deletion for potential nuking"""
     if not hasattr(channel, 'guild') or not channel.guild:
         return
-        
+    
+    channel_policies.remove_channel(channel)
+    guild_index.remove_channel(channel)
+    recent_messages.remove_channel(channel.guild.id, channel.id)
+    
     # Track channel deletion
     nuke_detected = anti_raid.add_action(channel.guild.id, 'channel_delete', channel.guild.me.id)
     
@@ -2588,9 +2995,34 @@ async def on_guild_channel_delete(channel):
         except Exception as e:
             logger.error(f"Error checking audit logs for channel deletion: {e}")
 
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Keep the channel indexes current when a channel is renamed or moves between categories"""
+    if after.guild:
+        channel_policies.index_channel(after)
+        guild_index.index_channel(after)
+
+@bot.event
+async def on_guild_join(guild):
+    channel_policies.index_guild(guild)
+    guild_index.index_guild(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    channel_policies.remove_guild(guild.id)
+    guild_index.remove_guild(guild.id)
+    recent_messages.remove_guild(guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """Keep the role index current when a role is renamed or its permissions change"""
+    guild_index.index_role(after)
+
 @bot.event
 async def on_guild_role_create(role):
     """Monitor role creation for potential nuking"""
+    guild_index.index_role(role)
+    
     # Track role creation
     nuke_detected = anti_raid.add_action(role.guild.id, 'role_create', role.guild.me.id)
     
@@ -2602,15 +3034,13 @@ async def on_guild_role_create(role):
                     # Someone is creating multiple roles rapidly (possible nuke)
                     
                     # Notify admins
-                    mod_log = discord.utils.get(role.guild.text_channels, name="mod-logs")
-                    if mod_log:
-                        embed = discord.Embed(
-                            title="🚨 NUKE ALERT - Multiple Roles Created",
-                            description=f"User {entry.user.mention} is creating multiple roles rapidly!",
-                            color=0xff0000
-                        )
-                        embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
-                        await mod_log.send(embed=embed)
+                    embed = discord.Embed(
+                        title="🚨 NUKE ALERT - Multiple Roles Created",
+                        description=f"User {entry.user.mention} is creating multiple roles rapidly!",
+                        color=0xff0000
+                    )
+                    embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
+                    mod_log_sink.log(role.guild, embed)
                     break
         except Exception as e:
             logger.error(f"Error checking audit logs for role creation: {e}")
@@ -2618,6 +3048,8 @@ async def on_guild_role_create(role):
 @bot.event
 async def on_guild_role_delete(role):
     """Monitor role deletion for potential nuking"""
+    guild_index.remove_role(role)
+    
     # Track role deletion
     nuke_detected = anti_raid.add_action(role.guild.id, 'role_delete', role.guild.me.id)
     
@@ -2629,15 +3061,13 @@ async def on_guild_role_delete(role):
                     # Someone is deleting multiple roles rapidly (possible nuke)
                     
                     # Notify admins
-                    mod_log = discord.utils.get(role.guild.text_channels, name="mod-logs")
-                    if mod_log:
-                        embed = discord.Embed(
-                            title="🚨 NUKE ALERT - Multiple Roles Deleted",
-                            description=f"User {entry.user.mention} is deleting multiple roles rapidly!",
-                            color=0xff0000
-                        )
-                        embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
-                        await mod_log.send(embed=embed)
+                    embed = discord.Embed(
+                        title="🚨 NUKE ALERT - Multiple Roles Deleted",
+                        description=f"User {entry.user.mention} is deleting multiple roles rapidly!",
+                        color=0xff0000
+                    )
+                    embed.add_field(name="Action", value="Consider revoking their admin permissions immediately!")
+                    mod_log_sink.log(role.guild, embed)
                     break
         except Exception as e:
             logger.error(f"Error checking audit logs for role deletion: {e}")
@@ -2679,6 +3109,39 @@ async def raid_mode(ctx, mode: str = None):
     
     else:
         await ctx.send("Invalid option. Use `!raidmode on` or `!raidmode off`.")
+
+@bot.command(name="raidstats")
+@commands.has_permissions(administrator=True)
+async def raid_stats(ctx):
+    """Show what the anti-raid system is tracking and how much memory it uses"""
+    stats = anti_raid.stats()
+    embed = discord.Embed(
+        title="🛡️ Anti-Raid Tracking",
+        description=f"{stats['guilds']} servers, {stats['windows']} windows, {stats['events']} events "
+                    f"(~{stats['bytes'] / 1024:.0f} KB)",
+        color=0x3498db
+    )
+    usage = anti_raid.guild_usage(ctx.guild.id)
+    embed.add_field(
+        name="This Server",
+        value="\n".join(f"`{name}`: {events} events from {users} users (~{size / 1024:.1f} KB)"
+                        for name, events, users, size in usage) or "Nothing tracked right now",
+        inline=False
+    )
+    embed.add_field(
+        name="Limits",
+        value=f"Events per server: {anti_raid.guild_events.get(ctx.guild.id, 0)}/{anti_raid.max_guild_events} "
+              f"(dropped at the cap: {anti_raid.events_capped})\n"
+              f"Servers in raid mode: {stats['raid_mode']}",
+        inline=False
+    )
+    embed.add_field(
+        name="Sweeps",
+        value=f"Every {anti_raid.sweep_interval}s: {anti_raid.sweeps} so far\n"
+              f"Windows dropped: {anti_raid.windows_evicted} | Servers dropped: {anti_raid.guilds_evicted}",
+        inline=False
+    )
+    await ctx.send(embed=embed)
         
 @bot.command(name="setuproles")
 @commands.has_permissions(administrator=True)
@@ -3352,7 +3815,7 @@ class VerifyButton(ui.View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Also send a message to the general channel
-            general_channel = discord.utils.get(guild.text_channels, name="general")
+            general_channel = guild_index.text_channel(guild, "general")
             if general_channel:
                 await general_channel.send(f"ゴゴゴゴ A new Stand user, {member.mention}, has joined the adventure! ゴゴゴゴ")
             
@@ -3420,11 +3883,7 @@ class TicketView(ui.View):
         ticket_number = ticket_data["counter"]
         
         # Find or create tickets category
-        category = None
-        for cat in guild.categories:
-            if cat.name.lower() == "tickets":
-                category = cat
-                break
+        category = guild_index.category(guild, "tickets")
         
         if not category:
             try:
@@ -3456,19 +3915,16 @@ class TicketView(ui.View):
             }
             
             # Add admin role permissions if available
-            admin_role = None
-            for role in guild.roles:
-                if role.permissions.administrator:
-                    admin_role = role
-                    overwrites[admin_role] = discord.PermissionOverwrite(
-                        view_channel=True,
-                        send_messages=True,
-                        read_messages=True,
-                        attach_files=True,
-                        read_message_history=True,
-                        manage_messages=True
-                    )
-                    break
+            admin_role = guild_index.admin_role(guild)
+            if admin_role:
+                overwrites[admin_role] = discord.PermissionOverwrite(
+                    view_channel=True,
+                    send_messages=True,
+                    read_messages=True,
+                    attach_files=True,
+                    read_message_history=True,
+                    manage_messages=True
+                )
             
             # Create the channel
             channel = await guild.create_text_channel(
@@ -4024,7 +4480,7 @@ async def verify_setup(ctx):
     await ctx.send(embed=embed, view=VerifyButton())
     
     # Confirm to admin
-    await ctx.send(f"✅ Verification system has been set up with roles: Verified ({verified_role.id}) and Unverified ({unverified_role.id})!", delete_after=10)
+    await send_temporary(ctx.channel, 10, f"✅ Verification system has been set up with roles: Verified ({verified_role.id}) and Unverified ({unverified_role.id})!")
 
 # Command to fix channel permissions for unverified users
 @bot.command(name="setupperms")
@@ -4080,7 +4536,7 @@ async def setup_permissions(ctx):
     if not welcome_channel:
         # Try to find by name if ID doesn't work
         for channel_name in ["verify", "verification", "welcome", "rules"]:
-            channel = discord.utils.get(guild.text_channels, name=channel_name)
+            channel = guild_index.text_channel(guild, channel_name)
             if channel:
                 welcome_channel = channel
                 await status_msg.edit(content=f"✅ Found welcome channel: #{channel.name}\n🔄 Fixing permissions...")
@@ -4177,6 +4633,17 @@ async def setup_permissions(ctx):
 # Add cleanup function for when bot exits
 def cleanup():
     """Clean up resources when bot exits"""
+    try:
+        # Keep the profanity filter's warmed-up states for the next start
+        profanity_filter.save_cache()
+        profanity_filter.close_batch_pool()
+        shadow_mode.stop()
+        deletion_scheduler.stop()
+        moderation_queue.stop()
+        mod_log_sink.stop()
+    except Exception as e:
+        logger.error(f"Error saving profanity filter cache: {e}")
+    
     try:
         # Remove lock file
         if os.path.exists(BOT_LOCK_FILE):
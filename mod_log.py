@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import discord
+
+logger = logging.getLogger('mod_log')
+
+
+class GuildLog:
+    """Events waiting to be sent to one guild's mod log"""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.embeds = []
+        # Titles of events beyond what is kept in full
+        self.overflow = Counter()
+        self.last_flush = 0.0
+
+    def __len__(self):
+        return len(self.embeds) + sum(self.overflow.values())
+
+
+class ModLogSink:
+    """
+    Buffers mod-log events per guild and sends them in batches.
+
+    log(guild, embed) only appends the embed to the guild's buffer. A
+    background task flushes a guild every flush_interval seconds, or sooner
+    once it has max_events buffered, but never more than once per min_gap
+    seconds. A flush is one message with up to 10 embeds (Discord's limit);
+    if more events are waiting, the first 9 are sent as they are and the rest
+    are counted by title in a summary embed. Beyond max_buffered events per
+    guild only the counts are kept, so a raid can't grow the buffer without
+    limit, but every event still shows up in a summary.
+    """
+
+    FLUSH_INTERVAL = 5.0
+    MIN_GAP = 1.0
+    MAX_EVENTS = 10
+    MAX_BUFFERED = 100
+    EMBEDS_PER_MESSAGE = 10
+
+    def __init__(self, find_channel, flush_interval=FLUSH_INTERVAL, max_events=MAX_EVENTS,
+                 max_buffered=MAX_BUFFERED, min_gap=MIN_GAP):
+        # find_channel(guild) returns the guild's mod-log channel or None
+        self.find_channel = find_channel
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_buffered = max_buffered
+        self.min_gap = min_gap
+        self._logs = {}
+        self._wakeup = None
+        self._task = None
+        self.logged = 0
+        self.overflowed = 0
+        self.messages_sent = 0
+        self.summarized = 0
+        self.undelivered = 0
+
+    def log(self, guild, embed):
+        """Queue an embed for a guild's mod log"""
+        guild_log = self._logs.get(guild.id)
+        if guild_log is None:
+            guild_log = self._logs[guild.id] = GuildLog(guild)
+        if embed.timestamp is None:
+            # Batched events keep the time they happened
+            embed.timestamp = datetime.now(timezone.utc)
+        if len(guild_log.embeds) < self.max_buffered:
+            guild_log.embeds.append(embed)
+        else:
+            guild_log.overflow[embed.title] += 1
+            self.overflowed += 1
+        self.logged += 1
+        self._ensure_task()
+        if len(guild_log) == self.max_events:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def pending(self):
+        return sum(len(guild_log) for guild_log in self._logs.values())
+
+    async def _run(self):
+        timeout = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            now = time.monotonic()
+            for guild_id, guild_log in list(self._logs.items()):
+                since = now - guild_log.last_flush
+                if not len(guild_log):
+                    if since >= self.flush_interval:
+                        del self._logs[guild_id]
+                    continue
+                if since < self.min_gap or (len(guild_log) < self.max_events and since < self.flush_interval):
+                    continue
+                del self._logs[guild_id]
+                try:
+                    await self._flush(guild_log)
+                except Exception as e:
+                    logger.error(f"Error sending mod log for {guild_log.guild.name}: {e}")
+                # Events logged during the send wait for the next batch
+                self._logs.setdefault(guild_id, GuildLog(guild_log.guild)).last_flush = now
+            # Busy guilds get their next batch as soon as the gap allows
+            busy = any(len(guild_log) >= self.max_events for guild_log in self._logs.values())
+            timeout = self.min_gap if busy else self.flush_interval
+
+    async def _flush(self, guild_log):
+        channel = self.find_channel(guild_log.guild)
+        if channel is None:
+            self.undelivered += len(guild_log)
+            return
+        embeds = guild_log.embeds
+        if len(embeds) > self.EMBEDS_PER_MESSAGE or guild_log.overflow:
+            keep = min(len(embeds), self.EMBEDS_PER_MESSAGE - 1)
+            counts = Counter(embed.title for embed in embeds[keep:])
+            counts.update(guild_log.overflow)
+            self.summarized += sum(counts.values())
+            embeds = embeds[:keep] + [self.summary_embed(counts)]
+        await channel.send(embeds=embeds)
+        self.messages_sent += 1
+
+    @staticmethod
+    def summary_embed(counts):
+        total = sum(counts.values())
+        embed = discord.Embed(
+            title="📋 Mod Log Summary",
+            description=f"{total} more event{'s' if total != 1 else ''} in this batch:",
+            color=0xff9900,
+            timestamp=datetime.now(timezone.utc)
+        )
+        for title, count in counts.most_common(10):
+            embed.add_field(name=title or "Event", value=f"{count}×")
+        if len(counts) > 10:
+            rest = sum(count for _, count in counts.most_common()[10:])
+            embed.add_field(name="Other", value=f"{rest}×")
+        return embed
+
+    def stop(self):
+        """Cancel the task; buffered events are not sent"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._logs.clear()
@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger('moderation_queue')
+
+# Job priorities, most important first. Under load the least important queued jobs are dropped first;
+# enforcement jobs are never dropped.
+PRIORITY_ENFORCE = 0   # Deleting messages, timeouts, roles that gate access
+PRIORITY_NOTIFY = 1    # Telling the member what happened
+PRIORITY_COSMETIC = 2  # Public warning embeds, welcome messages
+PRIORITY_NAMES = {PRIORITY_ENFORCE: "enforce", PRIORITY_NOTIFY: "notify", PRIORITY_COSMETIC: "cosmetic"}
+
+
+class ModerationQueues:
+    """
+    Bounded per-guild job queues served by a fixed pool of worker tasks.
+
+    Event handlers decide what to do right away and submit the Discord calls
+    as jobs instead of awaiting them, so a raid can't grow the number of
+    running tasks without limit. Each guild's queue holds at most max_depth
+    jobs; when it is full a new job replaces the least important queued job
+    (the newest of the lowest priority) if it outranks it, and is dropped
+    otherwise. Enforcement jobs are never dropped: if the queue holds nothing
+    but enforcement, a new enforcement job is queued past max_depth (a queued
+    job is a small tuple, and the same workers drain it). Jobs run most
+    important first. Guilds with queued jobs take turns, so one raided guild
+    can't starve the others.
+
+    A job is a coroutine function and its arguments; the coroutine is only
+    created when a worker runs it, so dropped jobs cost nothing.
+    """
+
+    WORKERS = 8
+    MAX_DEPTH = 200
+
+    def __init__(self, workers=WORKERS, max_depth=MAX_DEPTH):
+        self.worker_count = workers
+        self.max_depth = max_depth
+        self._counter = itertools.count()
+        # {guild_id: heap of (priority, seq, name, function, args, queued_at)}
+        self._queues = {}
+        # Guilds with queued jobs, in the order they get a turn
+        self._ready = deque()
+        self._wakeup = None
+        self._workers = []
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.high_water = 0
+        self.dropped = {priority: 0 for priority in PRIORITY_NAMES}
+        self.overflowed = 0
+        self.wait_total = 0.0
+
+    def submit(self, guild_id, priority, function, *args, name=None):
+        """Queue function(*args) for a guild; returns False if the job was dropped (never for enforcement)"""
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            queue = self._queues[guild_id] = []
+        job = (priority, next(self._counter), name or function.__name__, function, args, time.monotonic())
+
+        if len(queue) >= self.max_depth:
+            # The least important job is the largest (priority, seq)
+            worst = max(queue)
+            if worst[0] == PRIORITY_ENFORCE and priority == PRIORITY_ENFORCE:
+                # Nothing less important to drop to make room, so the queue grows past max_depth
+                self.overflowed += 1
+            elif (priority, job[1]) >= worst[:2]:
+                self.dropped[priority] += 1
+                return False
+            else:
+                queue.remove(worst)
+                heapq.heapify(queue)
+                self.dropped[worst[0]] += 1
+
+        heapq.heappush(queue, job)
+        self.submitted += 1
+        self.high_water = max(self.high_water, len(queue))
+        if len(queue) == 1:
+            self._ready.append(guild_id)
+        self._ensure_workers()
+        self._wakeup.set()
+        return True
+
+    def _ensure_workers(self):
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._work()) for _ in range(self.worker_count)]
+
+    def _next_job(self):
+        guild_id = self._ready.popleft()
+        queue = self._queues[guild_id]
+        job = heapq.heappop(queue)
+        if queue:
+            # Back of the line, so other guilds get a turn first
+            self._ready.append(guild_id)
+        else:
+            del self._queues[guild_id]
+        return job
+
+    async def _work(self):
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            priority, _, name, function, args, queued_at = self._next_job()
+            self.wait_total += time.monotonic() - queued_at
+            self.running += 1
+            try:
+                await function(*args)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error in moderation job {name}: {e}")
+            finally:
+                self.running -= 1
+
+    @property
+    def depth(self):
+        """Jobs queued across all guilds"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def guild_depths(self, limit=5):
+        """The deepest guild queues as (guild_id, depth), deepest first"""
+        depths = sorted(((guild_id, len(queue)) for guild_id, queue in self._queues.items()),
+                        key=lambda item: item[1], reverse=True)
+        return depths[:limit]
+
+    @property
+    def mean_wait_ms(self):
+        started = self.completed + self.failed + self.running
+        return self.wait_total / started * 1000 if started else 0.0
+
+    def stop(self):
+        """Cancel the workers and drop everything still queued"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._queues.clear()
+        self._ready.clear()
@@ -1,137 +1,1094 @@
 import re
 import os
+import hashlib
+import logging
+import multiprocessing
+import time
+import json
+import pickle
+import tempfile
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-class ProfanityFilter:
+logger = logging.getLogger('profanity_filter')
+
+# Characters that can stand in for each letter (leetspeak and lookalike glyphs)
+CHARACTER_CLASSES = {
+    'a': "a@4àáâäãåą∆Д",
+    'b': "b8ßвь",
+    'c': "c¢çćčс©",
+    'd': "dđďð",
+    'e': "e3èéêëęėξεЕ€",
+    'f': "fƒ",
+    'g': "g6ğģ9",
+    'h': "hħнΗн",
+    'i': "i1!¡íìîïįιΙ",
+    'j': "jјĵ",
+    'k': "kķĸκк",
+    'l': "l1|!łлιL£",
+    'm': "mмΜ",
+    'n': "nñнηИΝЛ",
+    'o': "o0òóôõöøөΟο☺☻⚪⚫",
+    'p': "pрρРπп♀",
+    'q': "q9",
+    'r': "rгř®яЯ",
+    's': "s5$śšşѕ",
+    't': "t7+тτТт†‡",
+    'u': "uüúùûụųμυµ",
+    'v': "v/υνν♈",
+    'w': "wшщẁẃẅwω",
+    'x': "x×хжж✗✘χ",
+    'y': "yýÿчụγ¥λΥ",
+    'z': "zžżźзж2",
+}
+
+# Characters that may be placed between letters to break up a word ("f.u.c.k")
+# Any whitespace character is accepted as a separator as well
+SEPARATOR_CHARS = "*.-_()'\""
+SEPARATOR_PATTERN = r'[\s\*\.\-_\(\)\'\"]*'
+
+
+def is_separator(char):
+    """Return True if the character may appear between the letters of a word"""
+    return char.isspace() or char in SEPARATOR_CHARS
+
+
+def is_word_char(char):
+    """Return True if the character counts as a word character for \\b"""
+    return char.isalnum() or char == '_'
+
+
+def word_keys(word):
     """
-    A class for filtering profanity from text messages.
-    Uses regex patterns to catch bypass attempts.
+    Split a word into the keys the matcher walks through.
+    Spaces are dropped because separators are allowed between any two letters anyway.
     """
-    
-    def __init__(self):
-        # Base list of profanity words
-        self.profanity_words = [
-            # Original list
-            "fuck", "shit", "bitch", "cunt", "dick", "cock", "pussy", "asshole", "whore",
-            "slut", "bastard", "damn", "nigger", "nigga", "niger", "n1gger", "n1gga", "retard", "faggot", "fag",
-            "nazi", "kike", "chink", "spic", "porn", "sex", "penis", "vagina", "ass",
-            
-            # Extended list (organized alphabetically)
-            "@buse", "@ss", "a$$", "abuse", "animal ka", "ape", "arse", 
-            "b!tch", "b!tch$", "b0b0", "b1tch", "b1tch$", "basterd", "bayut", "b**bs", 
-            "bich", "bj", "bjay", "blowjob", "bob0", "bobo", "bomb", "boobs", "b*tch", 
-            "btch", "bwisit", "b*yut", 
-            "c#nk", "c0ck", "c*ck", "ch!n", "ch!nk", "ch!n*k", "ch@nk", "ch1ld molester", 
-            "ch1nk", "ch1n*k", "child molester", "child porn", "c*hild porn", "ch*ld molester", 
-            "ch*ld p0rn", "ch*nk", "c*m", "cracker", "cum", "cut myself", 
-            "d1ck", "dam", "d*ck", "d*e", "d*mn", "dmn", "dumbass", 
-            "f.u.c.k", "f@ck", "f@g", "f@gger", "f@gget", "f@ggot", "f@got", "f4ggot", 
-            "f*ck", "fck", "f*g", "f*gg", "f*ggot", "fuk", "fuxk", 
-            "g!psy", "g1psy", "gaga", "gaga ka", "gago", "gago ka", "g*go", "go die", "g*psy", 
-            "gyp$y", "gypsy", 
-            "h3ll", "hayop ka", "h*e", "hell", "hentai", "hindot", "hind*t", "hindutan", 
-            "jizz", 
-            "k!ke", "k@ke", "k0ke", "k1ke", "k1ll", "kabaklaan", "k*ke", "k*ke$", "k*ll", "k*nt", 
-            "lantarang kabastusan", "leche", "lintik",
-            "m0lest", "makibaka", "m*l3st", "m*lest", "m*l*st", "monkey", 
-            "n!gga", "n!gger", "n@gga", "n@gger", "n€gger", "n0gga", "n0gger", "n1gga", "n1gger", 
-            "n3gg3r", "n3gga", "n*gga", "n*gger", "nsfw", "nude", "nudes", 
-            "p-uta", "p-utangina", "p@ta", "p0rn", "p3do", "p3dophile", "pakyu", "pakyu ka", 
-            "paq you", "paqyu", "p*d0", "p*do", "p*dophile", "p*doporn", "pedo", "pedophile", 
-            "peste", "p*k", "p*k yu", "p*kyu", "p*kyu ka", "p*nis", "p*rn", "p*ssy", "p*ssy$", 
-            "p*sty", "p*ta", "p*tangina", "pussi", "put*", "puta", "putang ina", "putang-ina", 
-            "putangina", "put*ngina", 
-            "r@pe", "r4pe", "rapist", "rap*st", "r*pe", "r*pist", "r*tard", 
-            "s.hit", "s3x", "sandn!gga", "sandn@gga", "sandn@gger", "sandn*gger", "selfharm", 
-            "sh*t", "sht", "sl*t", "sp!c", "sp@c", "sp0c", "sp1c", "sp*c", "sp*c$", "s*x", 
-            "t!nny", "t@nga", "t0welhead", "tang-ina", "tanga", "tangina", "tangina mo", 
-            "tanginamo", "t*anny", "tarantado", "terrorist", "tits", "t*nga", "t*ngina", 
-            "towelhead", "tr@nn@", "tr@nny", "tr4nny", "tranny", "tr*nny", "t*ts", "t*welh3ad", 
-            "t*welhead", 
-            "ul*l", "ulol", 
-            "walang hiya", "walanghiya", "wh*re"
-        ]
-        
-        # Additional keywords related to harassment
-        self.harassment_words = [
-            "kill yourself", "kys", "suicide", "hang yourself", "end yourself",
-            "rape", "raping", "molest", "molesting", "sexual", "pedophile", 
-            "die", "hang", "neck yourself"
+    return [char for char in word.lower() if char != ' ']
+
+
+# Characters re.IGNORECASE treats as the same letter although their lowercase forms
+# differ (the extra cases in re's compiler, plus "İ", whose simple lowercase is "i"),
+# each mapped to the lowercase character it is compared as
+IGNORECASE_EQUIVALENTS = {
+    '\u0130': 'i',  # İ LATIN CAPITAL LETTER I WITH DOT ABOVE
+    '\u0131': 'i',  # ı LATIN SMALL LETTER DOTLESS I
+    '\u017f': 's',  # ſ LATIN SMALL LETTER LONG S
+    '\u212a': 'k',  # K KELVIN SIGN
+    '\u212b': '\u00e5',  # Å ANGSTROM SIGN
+    '\u2126': '\u03c9',  # Ω OHM SIGN
+    '\u00b5': '\u03bc',  # µ MICRO SIGN
+    '\u0345': '\u03b9',  # COMBINING GREEK YPOGEGRAMMENI
+    '\u1fbe': '\u03b9',  # ι GREEK PROSGEGRAMMENI
+    '\u1fd3': '\u0390',  # ΐ GREEK SMALL LETTER IOTA WITH DIALYTIKA AND OXIA
+    '\u1fe3': '\u03b0',  # ΰ GREEK SMALL LETTER UPSILON WITH DIALYTIKA AND OXIA
+    '\u03d0': '\u03b2',  # ϐ GREEK BETA SYMBOL
+    '\u03f5': '\u03b5',  # ϵ GREEK LUNATE EPSILON SYMBOL
+    '\u03d1': '\u03b8',  # ϑ GREEK THETA SYMBOL
+    '\u03f0': '\u03ba',  # ϰ GREEK KAPPA SYMBOL
+    '\u03d6': '\u03c0',  # ϖ GREEK PI SYMBOL
+    '\u03f1': '\u03c1',  # ϱ GREEK RHO SYMBOL
+    '\u03c2': '\u03c3',  # ς GREEK SMALL LETTER FINAL SIGMA
+    '\u03d5': '\u03c6',  # ϕ GREEK PHI SYMBOL
+    '\u1c80': '\u0432',  # ᲀ CYRILLIC SMALL LETTER ROUNDED VE
+    '\u1c81': '\u0434',  # ᲁ CYRILLIC SMALL LETTER LONG-LEGGED DE
+    '\u1c82': '\u043e',  # ᲂ CYRILLIC SMALL LETTER NARROW O
+    '\u1c83': '\u0441',  # ᲃ CYRILLIC SMALL LETTER WIDE ES
+    '\u1c84': '\u0442',  # ᲄ CYRILLIC SMALL LETTER TALL TE
+    '\u1c85': '\u0442',  # ᲅ CYRILLIC SMALL LETTER THREE-LEGGED TE
+    '\u1c86': '\u044a',  # ᲆ CYRILLIC SMALL LETTER TALL HARD SIGN
+    '\u1c87': '\u0463',  # ᲇ CYRILLIC SMALL LETTER TALL YAT
+    '\u1c88': '\ua64b',  # ᲈ CYRILLIC SMALL LETTER UNBLENDED UK
+    '\u1e9b': '\u1e61',  # ẛ LATIN SMALL LETTER LONG S WITH DOT ABOVE
+    '\ufb05': '\ufb06',  # ﬅ LATIN SMALL LIGATURE LONG S T
+}
+
+
+def fold_case(char):
+    """Case-fold a single character the way re.IGNORECASE compares it"""
+    equivalent = IGNORECASE_EQUIVALENTS.get(char)
+    if equivalent is not None:
+        return equivalent
+    lowered = char.lower()
+    if len(lowered) != 1:
+        return char
+    return IGNORECASE_EQUIVALENTS.get(lowered, lowered)
+
+
+def key_members(key):
+    """Return the case-folded characters that can stand in for a key"""
+    return {fold_case(member) for member in CHARACTER_CLASSES.get(key, key)}
+
+
+def covers(general, specific):
+    """
+    Check if every text a word matches is also matched by another word, over the same span.
+    Both words are given as lists of keys (see word_keys).
+
+    Each letter of the specific word must line up with a letter of the general word
+    whose characters include all of its own, in order. A letter made only of
+    separators (like the "*" in "sh*t") may also fall into the separators allowed
+    after the previous letter. This is a safe approximation: it never claims a
+    word is covered when it isn't, though it may miss some that are.
+    """
+    return _covers(
+        [key_members(key) for key in general],
+        [(key_members(key), all(is_separator(member) for member in key_members(key))) for key in specific],
+    )
+
+
+def _covers(general, specific):
+    """covers() on precomputed member sets: general is a list of sets, specific of (set, is_separator)"""
+    # A specific word's first letter can't fall into separators
+    if not specific[0][0] <= general[0]:
+        return False
+    # reachable holds how many letters of the general word have been used so far
+    reachable = {1}
+    for members, separator in specific[1:]:
+        next_reachable = set()
+        for used in reachable:
+            if used < len(general) and members <= general[used]:
+                next_reachable.add(used + 1)
+            if separator:
+                next_reachable.add(used)
+        if not next_reachable:
+            return False
+        reachable = next_reachable
+    return len(general) in reachable
+
+
+def prune_words(words, groups):
+    """
+    Find words that other words in the same group already cover.
+    groups has one label per word. Returns {pruned index: index of a word that covers it}.
+    When two words cover each other the earlier one is kept.
+    """
+    sets = [[key_members(key) for key in word_keys(word)] for word in words]
+    members = [[(key, all(is_separator(member) for member in key)) for key in keys] for keys in sets]
+
+    pruned = {}
+    for index, specific in enumerate(members):
+        if not specific:
+            continue
+        for other, general in enumerate(members):
+            if (other == index or not general or groups[other] != groups[index]
+                    or len(general) > len(specific)):
+                continue
+            if not _covers(sets[other], specific):
+                continue
+            # Equivalent words: only the later one goes
+            if other < index or not _covers(sets[index], general):
+                pruned[index] = other
+                break
+    # Point each pruned word at a word that is kept
+    for index in pruned:
+        while pruned[index] in pruned:
+            pruned[index] = pruned[pruned[index]]
+    return pruned
+
+
+# Lowercase lookalike characters mapped to the first letter whose class lists them
+FOLD_TABLE = {}
+_FOLDED_LETTERS = {}
+for _letter, _chars in sorted(CHARACTER_CLASSES.items()):
+    for _char in _chars:
+        _FOLDED_LETTERS.setdefault(fold_case(_char), _letter)
+        _lowered = _char.lower()
+        if len(_lowered) == 1 and _lowered != _letter and not is_separator(_lowered):
+            FOLD_TABLE.setdefault(ord(_lowered), _letter)
+# Then the characters re.IGNORECASE considers the same as a listed one ("ı" for "i")
+for _char in ''.join(CHARACTER_CLASSES.values()) + ''.join(IGNORECASE_EQUIVALENTS):
+    _lowered = _char.lower()
+    _letter = _FOLDED_LETTERS.get(fold_case(_lowered))
+    if len(_lowered) == 1 and _letter is not None and _lowered != _letter and not is_separator(_lowered):
+        FOLD_TABLE.setdefault(ord(_lowered), _letter)
+# "İ" lowercases to "i" plus a combining dot above; drop the dot
+FOLD_TABLE[0x0307] = None
+del _letter, _chars, _char, _lowered
+
+WHITESPACE_RUN = re.compile(r'\s+')
+
+
+def fold_text(text):
+    """Lowercase the text, replace lookalike characters with plain letters and squeeze whitespace"""
+    return WHITESPACE_RUN.sub(' ', text.lower().translate(FOLD_TABLE))
+
+
+class SymbolTable(dict):
+    """
+    str.translate table mapping every character to the symbol of its group.
+
+    Characters that behave the same for a wordlist (same letter classes, both
+    separators or not, both \\w or not) share a symbol, so "A", "à" and "Д" all
+    turn into "a" unless a word uses one of them literally. Each symbol is written
+    as the first character that was put in its group, which keeps plain ASCII text
+    ASCII (and fast to translate). Characters not seen before are classified once
+    and then kept in the table.
+    """
+
+    MAX_ENTRIES = 65536
+
+    def __init__(self, membership):
+        super().__init__()
+        self.membership = membership
+        self.symbols = []
+        self.symbol_ids = {}
+        self._groups = {}
+
+    def __missing__(self, code):
+        char = chr(code)
+        symbol = (self.membership.get(fold_case(char), frozenset()), is_separator(char), is_word_char(char))
+        value = self._groups.get(symbol)
+        if value is None:
+            value = char
+            self._groups[symbol] = value
+            self.symbol_ids[value] = len(self.symbols)
+            self.symbols.append(symbol)
+        # Don't let a stream of unusual characters grow the table forever
+        if len(self) < self.MAX_ENTRIES:
+            self[code] = value
+        return value
+
+
+class NormalizedText:
+    """
+    A message normalized once so every check can reuse it.
+
+    symbols has one symbol per character of the original text (so offsets line up),
+    collapsed squeezes separator runs and long repeats for fast checks and cache keys,
+    and folded is a plain lowercase copy with lookalike characters replaced, for
+    keyword checks.
+    """
+
+    __slots__ = ("original", "normalizer", "symbols", "_collapsed", "_folded")
+
+    def __init__(self, original, normalizer):
+        self.original = original
+        self.normalizer = normalizer
+        self.symbols = original.translate(normalizer.table)
+        self._collapsed = None
+        self._folded = None
+
+    @property
+    def collapsed(self):
+        if self._collapsed is None:
+            self._collapsed = self.normalizer.collapse(self.symbols)
+        return self._collapsed
+
+    @property
+    def folded(self):
+        if self._folded is None:
+            self._folded = fold_text(self.original)
+        return self._folded
+
+    def __str__(self):
+        return self.original
+
+    def __bool__(self):
+        return bool(self.original)
+
+
+class TextNormalizer:
+    """
+    Normalizes text for a WordMatcher with precomputed tables.
+
+    Separator runs keep each separator once (literal ones like "*" up to the
+    repeat limit) and runs of the same symbol are cut to the repeat limit, which
+    is the longest stretch of letters in any word that one character could fill.
+    Neither step changes what the matcher finds.
+    """
+
+    def __init__(self, membership, repeat_limit):
+        self.repeat_limit = repeat_limit
+        self.table = SymbolTable(membership)
+
+        # Fill the table up front, plain ASCII first so it names the shared symbols
+        for code in range(32, 127):
+            self.table[code]
+        for char in "\t\n":
+            self.table[ord(char)]
+        for char in membership:
+            for variant in (char, char.upper(), char.lower()):
+                if len(variant) == 1:
+                    self.table[ord(variant)]
+
+        separator_symbols = {}
+        for value, symbol_id in self.table.symbol_ids.items():
+            keys, separator, _ = self.table.symbols[symbol_id]
+            if separator:
+                separator_symbols[value] = repeat_limit if keys else 1
+        self._separator_limits = separator_symbols
+        separator_class = '[' + ''.join(re.escape(char) for char in separator_symbols) + ']'
+        self._separator_run = re.compile(separator_class + '{2,}')
+        self._repeat_run = re.compile(r'(.)\1{%d,}' % repeat_limit, re.DOTALL)
+
+    @property
+    def symbols(self):
+        """List of (keys, is_separator, is_word_char) tuples indexed by symbol id"""
+        return self.table.symbols
+
+    @property
+    def symbol_ids(self):
+        """Map of symbol character to symbol id"""
+        return self.table.symbol_ids
+
+    def normalize(self, text):
+        """Normalize a message (an already normalized one is returned as is)"""
+        if isinstance(text, NormalizedText):
+            if text.normalizer is self:
+                return text
+            text = text.original
+        return NormalizedText(text, self)
+
+    def _squeeze_separators(self, match):
+        counts = {}
+        kept = []
+        for char in match.group():
+            count = counts.get(char, 0)
+            if count < self._separator_limits[char]:
+                counts[char] = count + 1
+                kept.append(char)
+        # The last separator decides whether the next letter starts at a \b
+        if kept[-1] != char:
+            kept.append(char)
+        return ''.join(kept)
+
+    def collapse(self, symbols):
+        """Squeeze separator runs and long runs of the same symbol"""
+        symbols = self._separator_run.sub(self._squeeze_separators, symbols)
+        limit = self.repeat_limit
+        return self._repeat_run.sub(lambda match: match.group(1) * limit, symbols)
+
+
+class WordMatcher:
+    """
+    Finds words from a wordlist in a single pass over the text.
+
+    The words are stored in a trie whose edges are the same character classes the
+    regex patterns use, and every partial match is followed at the same time while
+    the text is read. Each set of partial matches is cached as a state, so after a
+    short warm-up every character costs one dict lookup no matter how many words
+    are in the list. The rules are the same as the per-word regex:
+    \\b, one or more characters per letter, optional separators, \\b.
+
+    Unlike the regex engine this never backtracks: a character costs at most one
+    new state, and a state can't hold more partial matches than the trie has
+    nodes, so a check is linear in the length of the text. The state cache is
+    capped at max_states and starts over when it fills up.
+    """
+
+    ROOT = 0
+    MAX_STATES = 4096
+
+    def __init__(self, words, max_states=MAX_STATES, groups=None):
+        self.words = list(words)
+        self.max_states = max_states
+        # Words another word in the same group already covers are left out of the trie
+        # (see prune_words); find_all reports the covering word for their matches
+        self.groups = list(groups) if groups is not None else None
+        self.pruned = prune_words(self.words, self.groups) if groups is not None else {}
+        self.cache_resets = 0
+        self._states = []
+        self._state_index = {}
+        self._state_terminal = []
+        self._transitions = []
+        self._moves = {}
+
+        # Trie: children[node] maps a key to the next node, labels[node] is the key
+        # that led into the node and outputs[node] is the index of the word ending there
+        self._children = [{}]
+        self._labels = [None]
+        self._outputs = [None]
+
+        for index, word in enumerate(self.words):
+            keys = word_keys(word)
+            if not keys or index in self.pruned:
+                continue
+            node = self.ROOT
+            for key in keys:
+                child = self._children[node].get(key)
+                if child is None:
+                    child = len(self._children)
+                    self._children.append({})
+                    self._labels.append(key)
+                    self._outputs.append(None)
+                    self._children[node][key] = child
+                node = child
+            if self._outputs[node] is None:
+                self._outputs[node] = index
+
+        # Map each (case-folded) character to the set of keys it can stand for
+        membership = {}
+        for key in set(self._labels[1:]):
+            for member in key_members(key):
+                membership.setdefault(member, set()).add(key)
+        membership = {char: frozenset(keys) for char, keys in membership.items()}
+
+        self.normalizer = TextNormalizer(membership, self._repeat_limit())
+        self.reset_cache()
+
+    def _repeat_limit(self):
+        """Longest stretch of consecutive letters in any word that a single character can fill"""
+        limit = 1
+        for index, word in enumerate(self.words):
+            if index in self.pruned:
+                continue
+            members = [key_members(key) for key in word_keys(word)]
+            for start in range(len(members)):
+                common = members[start]
+                end = start + 1
+                while end < len(members) and common & members[end]:
+                    common = common & members[end]
+                    end += 1
+                limit = max(limit, end - start)
+        return limit
+
+    @property
+    def node_count(self):
+        """Number of nodes in the trie (including the root)"""
+        return len(self._children)
+
+    @property
+    def state_count(self):
+        """Number of cached matcher states"""
+        return len(self._states)
+
+    def reset_cache(self):
+        """Forget every cached state and transition"""
+        # States: (frozenset of partial matches, previous character was a word character)
+        # A partial match is encoded as node * 2 + 1 if separators were seen since its last letter
+        # The lists are cleared in place so a search that is running keeps valid references
+        self._states.clear()
+        self._state_index.clear()
+        self._state_terminal.clear()
+        self._transitions.clear()
+        self._moves.clear()
+        self._start = self._state(frozenset(), False)
+
+    def _state(self, threads, prev_word):
+        """Get the state id for a set of partial matches, creating it if needed"""
+        state = (threads, prev_word)
+        state_id = self._state_index.get(state)
+        if state_id is None:
+            state_id = len(self._states)
+            self._states.append(state)
+            self._state_index[state] = state_id
+            self._state_terminal.append(any(self._outputs[thread >> 1] is not None for thread in threads))
+            self._transitions.append({})
+        return state_id
+
+    def _step(self, state_id, symbol):
+        """
+        Compute the transition for a symbol.
+        Returns the next state id, or its bitwise inverse if a word ended right before the symbol.
+        """
+        threads, prev_word = self._states[state_id]
+        keys, separator, word_char = self.normalizer.symbols[self.normalizer.symbol_ids[symbol]]
+        boundary = prev_word != word_char
+
+        # A word ends here if a thread finished its last letter and we are at a \b
+        matched = boundary and self._state_terminal[state_id]
+
+        # A new word can only start at a \b
+        active = threads | {self.ROOT * 2} if boundary else threads
+        next_threads = set()
+        for thread in active:
+            node = thread >> 1
+            if node != self.ROOT:
+                if separator:
+                    next_threads.add(node * 2 + 1)
+                # The same letter may repeat ("fuuuck") until a separator is seen
+                if not thread & 1 and self._labels[node] in keys:
+                    next_threads.add(thread)
+            children = self._children[node]
+            for key in keys:
+                child = children.get(key)
+                if child is not None:
+                    next_threads.add(child * 2)
+
+        if len(self._states) >= self.max_states:
+            # Start over instead of letting the cache grow without bound
+            self.cache_resets += 1
+            self.reset_cache()
+            state_id = self._state(threads, prev_word)
+
+        next_id = self._state(frozenset(next_threads), word_char)
+        result = ~next_id if matched else next_id
+        self._transitions[state_id][symbol] = result
+        return result
+
+    def _accepts_at_end(self, state_id):
+        """Check if a word ends at the end of the text"""
+        return self._state_terminal[state_id] and self._states[state_id][1]
+
+    def normalize(self, text):
+        """Normalize a message for this matcher"""
+        return self.normalizer.normalize(text)
+
+    def search(self, text):
+        """Return True if any word of the list appears in the text (a str or NormalizedText)"""
+        transitions = self._transitions
+        state = self._start
+        for symbol in self.normalize(text).symbols:
+            next_state = transitions[state].get(symbol)
+            if next_state is None:
+                next_state = self._step(state, symbol)
+            if next_state < 0:
+                return True
+            state = next_state
+        return self._accepts_at_end(state)
+
+    def _thread_moves(self, thread, symbol):
+        """
+        List where a partial match can go on a symbol.
+        Returns a tuple of (next_thread, consumed_a_letter) pairs.
+        """
+        keys, separator, _ = self.normalizer.symbols[self.normalizer.symbol_ids[symbol]]
+        node = thread >> 1
+        moves = []
+        if node != self.ROOT:
+            if separator:
+                moves.append((node * 2 + 1, False))
+            if not thread & 1 and self._labels[node] in keys:
+                moves.append((thread, True))
+        children = self._children[node]
+        for key in keys:
+            child = children.get(key)
+            if child is not None:
+                moves.append((child * 2, True))
+        moves = tuple(moves)
+
+        if len(self._moves) >= self.max_states * 16:
+            self._moves.clear()
+        self._moves[(thread, symbol)] = moves
+        return moves
+
+    def find_all(self, text):
+        """
+        Find every word in the text in one pass.
+        Returns (start, end, word_index) tuples sorted by position, where start and end
+        are offsets into the original text and end is right after the last letter.
+        """
+        normalized = self.normalize(text)
+        if not self.search(normalized):
+            return []
+
+        symbols = self.normalizer.symbols
+        symbol_ids = self.normalizer.symbol_ids
+        outputs = self._outputs
+        moves_cache = self._moves
+        root = self.ROOT * 2
+
+        # Partial matches: thread -> (start, end of its last letter)
+        threads = {}
+        found = {}
+        prev_word = False
+
+        for position, symbol in enumerate(normalized.symbols):
+            word_char = symbols[symbol_ids[symbol]][2]
+            if prev_word != word_char:
+                # Words that are complete end at this \b, and a new word may start here
+                for thread, (start, end) in threads.items():
+                    index = outputs[thread >> 1]
+                    if index is not None and found.get((start, index), -1) < end:
+                        found[(start, index)] = end
+                if root not in threads:
+                    threads[root] = (position, position)
+
+            next_threads = {}
+            letter_end = position + 1
+            for thread, span in threads.items():
+                moves = moves_cache.get((thread, symbol))
+                if moves is None:
+                    moves = self._thread_moves(thread, symbol)
+                start = span[0]
+                for next_thread, letter in moves:
+                    end = letter_end if letter else span[1]
+                    # Keep the earliest start (and the furthest letter for that start)
+                    current = next_threads.get(next_thread)
+                    if current is None or start < current[0] or (start == current[0] and end > current[1]):
+                        next_threads[next_thread] = (start, end)
+            threads = next_threads
+            prev_word = word_char
+
+        if prev_word:
+            for thread, (start, end) in threads.items():
+                index = outputs[thread >> 1]
+                if index is not None and found.get((start, index), -1) < end:
+                    found[(start, index)] = end
+
+        return sorted((start, end, index) for (start, index), end in found.items())
+
+
+# Compiled matchers are cached on disk so restarts don't rebuild them.
+# Bump the version when the cache layout changes; any edit to this file also
+# changes the key, so a stale pickle is never loaded into newer code.
+FILTER_CACHE_VERSION = 1
+MAX_CACHE_FILES = 10
+
+with open(__file__, 'rb') as _source:
+    SOURCE_DIGEST = hashlib.sha256(_source.read()).hexdigest()
+del _source
+
+
+def wordlist_digest(words, groups=None):
+    """Hash a wordlist together with everything else a compiled matcher depends on"""
+    digest = hashlib.sha256()
+    digest.update(f"v{FILTER_CACHE_VERSION}:{SOURCE_DIGEST}\0".encode())
+    for word in words:
+        digest.update(word.encode('utf-8') + b"\0")
+    if groups is not None:
+        digest.update(b"groups\0")
+        for group in groups:
+            digest.update(str(group).encode('utf-8') + b"\0")
+    return digest.hexdigest()
+
+
+def matcher_cache_path(cache_dir, digest):
+    """Path of the cache file for a wordlist digest"""
+    return os.path.join(cache_dir, f"matcher-v{FILTER_CACHE_VERSION}-{digest[:32]}.pickle")
+
+
+def save_matcher(matcher, cache_dir):
+    """Write a compiled matcher (with its warmed-up states) to the cache"""
+    digest = wordlist_digest(matcher.words, matcher.groups)
+    path = matcher_cache_path(cache_dir, digest)
+    payload = {"version": FILTER_CACHE_VERSION, "digest": digest, "matcher": matcher}
+    temp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # A file of its own, so threads saving the same matcher don't write into each other's
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"matcher-{digest}.", suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Replace atomically so a crash never leaves half a file behind
+        os.replace(temp_path, path)
+    except Exception as e:
+        logger.warning(f"Could not save profanity filter cache to {path}: {e}")
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+
+    # Keep only the newest cache files
+    try:
+        cached = [
+            os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+            if name.startswith("matcher-") and name.endswith(".pickle")
         ]
-        
+        cached.sort(key=os.path.getmtime, reverse=True)
+        for old_path in cached[MAX_CACHE_FILES:]:
+            os.remove(old_path)
+    except OSError as e:
+        logger.warning(f"Could not clean up profanity filter cache: {e}")
+
+
+def load_matcher(words, cache_dir=None, groups=None):
+    """
+    Return a WordMatcher for the words (pruned within groups, if given).
+    If cache_dir is set, a matcher compiled earlier for the same words is loaded from
+    there, otherwise a new one is built and saved for the next start.
+    """
+    words = list(words)
+    if not cache_dir:
+        return WordMatcher(words, groups=groups)
+
+    digest = wordlist_digest(words, groups)
+    path = matcher_cache_path(cache_dir, digest)
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get("version") == FILTER_CACHE_VERSION and payload.get("digest") == digest:
+            return payload["matcher"]
+        logger.warning(f"Ignoring profanity filter cache {path}: it was built for a different wordlist")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable profanity filter cache {path}: {e}")
+
+    matcher = WordMatcher(words, groups=groups)
+    save_matcher(matcher, cache_dir)
+    return matcher
+
+
+# A word found in a message; category is "profanity" or "harassment"
+ProfanityMatch = namedtuple("ProfanityMatch", ["start", "end", "word", "category"])
+
+
+def merge_spans(spans):
+    """Merge overlapping or touching (start, end) spans into a sorted list"""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class GuildWordlists:
+    """
+    Per-guild changes to the shared wordlists.
+
+    A guild can add its own words and remove (allow) words from the shared lists.
+    The shared matcher is never rebuilt for this: added words go into a small
+    matcher of their own per guild, which is rebuilt and swapped in whole when the
+    guild's list changes, and removed words are skipped when the shared matcher
+    reports them. Compiled guild matchers live in an LRU cache of at most
+    max_compiled guilds and are rebuilt on demand after eviction.
+
+    Spelling variants pruned from the shared matcher are reported as the word
+    that covers them, so allowing a shared word also allows those variants.
+    A pruned variant can't be allowed on its own; removing one is refused and
+    names the word to remove instead.
+
+    The lists are saved as JSON so they survive restarts.
+    """
+
+    MAX_COMPILED = 128
+    # Guild matchers only hold a few words, so they get a much smaller state cache
+    MAX_GUILD_STATES = 512
+    MAX_WORDS_PER_GUILD = 500
+    MAX_WORD_LENGTH = 50
+
+    def __init__(self, global_words, path=None, max_compiled=MAX_COMPILED, covers=None):
+        self.path = path
+        self.max_compiled = max_compiled
+        self.set_global_words(global_words, covers)
+        # {guild_id: {"added": [words], "removed": {word key: word as the moderator typed it}}}
+        # (keys are only for matching; lists show the words)
+        self._lists = {}
+        self._compiled = OrderedDict()
+        # Bumped on every change so results cached for the old lists can be told apart
+        self._generations = {}
+        self.compiles = 0
+        self.evictions = 0
+        self.load()
+
+    def set_global_words(self, global_words, covers=None):
+        """
+        Use a new version of the shared lists.
+        covers maps words pruned from the shared matcher to the word that covers them.
+        """
+        self._global_keys = {tuple(word_keys(word)) for word in global_words}
+        # {pruned word key: covering word}
+        self._covered = {tuple(word_keys(word)): cover for word, cover in (covers or {}).items()}
+
+    def load(self):
+        """Load the guild wordlists from disk"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading guild wordlists: {e}")
+            return
+        for guild_id, entry in data.items():
+            self._lists[int(guild_id)] = {
+                "added": list(entry.get("added", [])),
+                "removed": {tuple(word_keys(word)): word for word in entry.get("removed", [])},
+            }
+
+    def save(self):
+        """Write the guild wordlists to disk"""
+        if not self.path:
+            return
+        data = {
+            str(guild_id): {
+                "added": entry["added"],
+                "removed": sorted(entry["removed"].values()),
+            }
+            for guild_id, entry in self._lists.items()
+            if entry["added"] or entry["removed"]
+        }
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving guild wordlists: {e}")
+
+    def _entry(self, guild_id):
+        return self._lists.setdefault(guild_id, {"added": [], "removed": {}})
+
+    def _changed(self, guild_id):
+        self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
+        self.save()
+
+    def generation(self, guild_id):
+        """Number of times a guild's lists have changed since startup"""
+        return self._generations.get(guild_id, 0)
+
+    def clean_word(self, word):
+        """
+        Normalize a word a moderator typed.
+        Raises ValueError if it can't be used as a filter word.
+        """
+        word = ' '.join(word.lower().split())
+        if not word_keys(word):
+            raise ValueError("The word is empty.")
+        if len(word) > self.MAX_WORD_LENGTH:
+            raise ValueError(f"Words can be at most {self.MAX_WORD_LENGTH} characters long.")
+        return word
+
+    def add_word(self, guild_id, word):
+        """
+        Filter a word in a guild (or stop allowing a shared word that was removed).
+        Returns False if the word was already filtered there.
+        """
+        word = self.clean_word(word)
+        keys = tuple(word_keys(word))
+        entry = self._entry(guild_id)
+        if keys in entry["removed"]:
+            del entry["removed"][keys]
+        elif keys in self._global_keys or any(tuple(word_keys(added)) == keys for added in entry["added"]):
+            return False
+        else:
+            if len(entry["added"]) >= self.MAX_WORDS_PER_GUILD:
+                raise ValueError(f"A server can add at most {self.MAX_WORDS_PER_GUILD} words.")
+            entry["added"].append(word)
+            self._compiled.pop(guild_id, None)
+        self._changed(guild_id)
+        return True
+
+    def remove_word(self, guild_id, word):
+        """
+        Stop filtering a word in a guild, whether the guild added it or it's a shared word.
+        Returns False if the word wasn't filtered there. Raises ValueError for a
+        spelling variant pruned from the shared lists, naming the word that covers it.
+        """
+        word = self.clean_word(word)
+        keys = tuple(word_keys(word))
+        entry = self._entry(guild_id)
+        added = [existing for existing in entry["added"] if tuple(word_keys(existing)) != keys]
+        if len(added) != len(entry["added"]):
+            entry["added"] = added
+            self._compiled.pop(guild_id, None)
+        elif keys in self._covered:
+            cover = self._covered[keys]
+            raise ValueError(
+                f"\"{word}\" is filtered as a spelling of \"{cover}\" and can't be allowed on its own. "
+                f"Remove \"{cover}\" to allow both."
+            )
+        elif keys in self._global_keys and keys not in entry["removed"]:
+            entry["removed"][keys] = word
+        else:
+            return False
+        self._changed(guild_id)
+        return True
+
+    def added_words(self, guild_id):
+        """Words a guild filters on top of the shared lists"""
+        entry = self._lists.get(guild_id)
+        return list(entry["added"]) if entry else []
+
+    def removed_words(self, guild_id):
+        """Shared words a guild allows"""
+        entry = self._lists.get(guild_id)
+        return sorted(entry["removed"].values()) if entry else []
+
+    def is_removed(self, guild_id, word):
+        """Check if a guild allows a word from the shared lists"""
+        entry = self._lists.get(guild_id)
+        return bool(entry and entry["removed"]) and tuple(word_keys(word)) in entry["removed"]
+
+    def has_removed(self, guild_id):
+        """Check if a guild allows any of the shared words"""
+        entry = self._lists.get(guild_id)
+        return bool(entry and entry["removed"])
+
+    def matcher(self, guild_id):
+        """Get the compiled matcher for a guild's own words, or None if it has none"""
+        matcher = self._compiled.get(guild_id)
+        if matcher is not None:
+            self._compiled.move_to_end(guild_id)
+            return matcher
+
+        entry = self._lists.get(guild_id)
+        if not entry or not entry["added"]:
+            return None
+
+        matcher = WordMatcher(entry["added"], max_states=self.MAX_GUILD_STATES,
+                              groups=[guild_id] * len(entry["added"]))
+        self.compiles += 1
+        self._compiled[guild_id] = matcher
+        while len(self._compiled) > self.max_compiled:
+            self._compiled.popitem(last=False)
+            self.evictions += 1
+        return matcher
+
+    @property
+    def compiled_count(self):
+        """Number of guild matchers currently in memory"""
+        return len(self._compiled)
+
+
+class VerdictCache:
+    """
+    Remembers moderation verdicts for message content that was already checked.
+
+    During a raid many accounts post the same text, so the verdict is stored
+    under a hash of the content and copies skip the checks. Entries expire
+    after ttl seconds and the least recently used ones are dropped once
+    max_entries is reached; each entry is a small tuple key and a short string.
+    """
+
+    MAX_ENTRIES = 4096
+    TTL = 300
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (verdict, expires_at)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached verdict for a key, or None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, verdict):
+        """Store a verdict"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (verdict, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Forget every verdict"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """Share of lookups that were hits (0 if there were none)"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# Filters built inside scan_batch worker processes, keyed by their settings
+_worker_filters = OrderedDict()
+MAX_WORKER_FILTERS = 8
+
+
+def _scan_chunk(settings, texts):
+    """Check a chunk of texts in a worker process (see ProfanityFilter.scan_batch)"""
+    profanity_filter = _worker_filters.get(settings)
+    if profanity_filter is None:
+        engine, regex_length_limit, cache_dir, wordlist_dir, _, added, removed = settings
+        profanity_filter = ProfanityFilter(engine, regex_length_limit, cache_dir, wordlist_dir=wordlist_dir)
+        for word in added:
+            profanity_filter.guild_wordlists.add_word(0, word)
+        for word in removed:
+            try:
+                profanity_filter.guild_wordlists.remove_word(0, word)
+            except ValueError:
+                # Allowed before it was pruned; the shared matcher never reports it now anyway
+                pass
+        _worker_filters[settings] = profanity_filter
+        if len(_worker_filters) > MAX_WORKER_FILTERS:
+            _worker_filters.popitem(last=False)
+    guild_id = 0 if settings[5] or settings[6] else None
+    return [profanity_filter.contains_profanity(text, guild_id) for text in texts]
+
+
+# Default location of the wordlist files, next to this module
+WORDLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+PROFANITY_FILE = "profanity.txt"
+HARASSMENT_FILE = "harassment.txt"
+
+
+def load_wordlist(path):
+    """Read a wordlist file: one word per line, blank lines and lines starting with # are skipped"""
+    words = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word = ' '.join(line.lower().split())
+            if word and not word.startswith('#'):
+                words.append(word)
+    return words
+
+
+class CompiledWordlists:
+    """
+    One version of the shared wordlists, compiled and ready to check messages.
+
+    ProfanityFilter holds one of these and replaces it in a single assignment
+    when the wordlist files change, so a check that is already running finishes
+    on the version it started with and nothing has to wait for a compile.
+    """
+
+    def __init__(self, profanity_words, harassment_words, engine="automaton", cache_dir=None,
+                 prune=True, version=1, signature=None):
+        start_time = time.perf_counter()
+        self.profanity_words = list(profanity_words)
+        self.harassment_words = list(harassment_words)
+        self.words = self.profanity_words + self.harassment_words
+        self.version = version
+        # File sizes and modification times the lists were read at (None if they weren't read from files)
+        self.signature = signature
+        self.digest = wordlist_digest(self.words)[:12]
+
+        # Build (or load from the cache) the single-pass matcher for the words
+        groups = [self.category(index) for index in range(len(self.words))] if prune else None
+        self.matcher = load_matcher(self.words, cache_dir, groups)
+
         # Compile all words into regex patterns to catch bypasses
-        self.compile_regex_patterns()
-    
+        # (only the regex engine needs them, and they are slow to compile)
+        self.patterns = None
+        self.pattern_indexes = None
+        if engine == "regex":
+            self.compile_regex_patterns()
+
+        self.compile_time = time.perf_counter() - start_time
+
+    def category(self, index):
+        """Name the list a word index (into profanity_words + harassment_words) belongs to"""
+        return "profanity" if index < len(self.profanity_words) else "harassment"
+
     def compile_regex_patterns(self):
         """Compile regex patterns for each word to catch bypass attempts"""
         self.patterns = []
-        
-        # Process all profanity words
-        for word in self.profanity_words + self.harassment_words:
+        # Index of the word each pattern was built from
+        self.pattern_indexes = []
+
+        # Process all profanity words (except the ones pruned as covered by another word)
+        for index, word in enumerate(self.words):
+            if index in self.matcher.pruned:
+                continue
+            self.pattern_indexes.append(index)
+
             # Basic pattern to catch the word itself
             pattern = r'\b'
-            
+
             # For each character in the word, create a pattern that matches:
             # - The character itself
             # - Common substitutions (e.g., 'a' can be '@', '4', etc.)
             # - Optional spaces or symbols between characters
             for char in word:
-                if char == 'a':
-                    pattern += r'[a@4àáâäãåą∆Д]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'b':
-                    pattern += r'[b8ßвь]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'c':
-                    pattern += r'[c¢çćčс©]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'd':
-                    pattern += r'[dđďð]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'e':
-                    pattern += r'[e3èéêëęėξεЕ€]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'f':
-                    pattern += r'[fƒ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'g':
-                    pattern += r'[g6ğģ9]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'h':
-                    pattern += r'[hħнΗн]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'i':
-                    pattern += r'[i1!¡íìîïįιΙ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'j':
-                    pattern += r'[jјĵ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'k':
-                    pattern += r'[kķĸκк]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'l':
-                    pattern += r'[l1|!łлιL£]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'm':
-                    pattern += r'[mмΜ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'n':
-                    pattern += r'[nñнηИΝЛ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'o':
-                    pattern += r'[o0òóôõöøөΟο☺☻⚪⚫]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'p':
-                    pattern += r'[pрρРπп♀]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'q':
-                    pattern += r'[q9]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'r':
-                    pattern += r'[rгř®яЯ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 's':
-                    pattern += r'[s5$śšşѕ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 't':
-                    pattern += r'[t7+тτТт†‡]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'u':
-                    pattern += r'[uüúùûụųμυµ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'v':
-                    pattern += r'[v\/υνν♈]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'w':
-                    pattern += r'[wшщẁẃẅwω]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'x':
-                    pattern += r'[x×хжж✗✘χ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'y':
-                    pattern += r'[yýÿчụγ¥λΥ]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == 'z':
-                    pattern += r'[zžżźзж2]+[\s\*\.\-_\(\)\'\"]*'
-                elif char == ' ':
-                    pattern += r'[\s\*\.\-_\(\)\'\"]*'
+                if char == ' ':
+                    pattern += SEPARATOR_PATTERN
                 else:
-                    pattern += r'[' + re.escape(char) + r']+[\s\*\.\-_\(\)\'\"]*'
-            
+                    chars = CHARACTER_CLASSES.get(char, char)
+                    pattern += '[' + ''.join(re.escape(c) for c in chars) + ']+' + SEPARATOR_PATTERN
+
             pattern += r'\b'
             try:
                 self.patterns.append(re.compile(pattern, re.IGNORECASE))
@@ -139,34 +1096,357 @@ class ProfanityFilter:
                 # If there's an error compiling the regex, use a simpler version
                 simple_pattern = r'\b' + ''.join([char + r'[\s\*\.\-_]*' for char in word]) + r'\b'
                 self.patterns.append(re.compile(simple_pattern, re.IGNORECASE))
+
+
+class ProfanityFilter:
+    """
+    A class for filtering profanity from text messages.
+    Uses regex patterns to catch bypass attempts.
+    
+    The default "automaton" engine checks every word in a single pass with a
+    WordMatcher and runs in linear time on any input. The "regex" engine runs one
+    compiled pattern per word; those patterns backtrack badly on long runs of
+    letters and separators, so texts longer than regex_length_limit are always
+    checked by the automaton instead.
+    
+    With prune on, spelling variants that another word on the same list already
+    covers (like "b1tch", which "bitch" matches anyway) are left out of both
+    engines. Matches of a pruned word are reported as the word that covers it.
+    
+    The words are read from profanity.txt and harassment.txt in wordlist_dir.
+    When the files change, compile_wordlists() builds a new version (it can run
+    in another thread) and swap_wordlists() puts it in place.
+    """
+    
+    ENGINES = ("automaton", "regex")
+    
+    # Texts sent to a scan_batch worker at a time
+    BATCH_CHUNK_SIZE = 256
+    
+    # Longest text the regex engine is trusted with (a 64 character adversarial
+    # message already takes tens of milliseconds)
+    REGEX_LENGTH_LIMIT = 64
+    
+    def __init__(self, engine="automaton", regex_length_limit=REGEX_LENGTH_LIMIT, cache_dir=None,
+                 guild_wordlists_path=None, prune=True, wordlist_dir=WORDLIST_DIR):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown profanity filter engine: {engine}")
+        self.engine = engine
+        self.regex_length_limit = regex_length_limit
+        # Where the compiled matcher is cached between restarts (None disables the cache)
+        self.cache_dir = cache_dir
+        self.prune = prune
+        self.wordlist_dir = wordlist_dir
+        
+        # Load the profanity and harassment words and compile them
+        self.compiled = None
+        # File signature compile_wordlists() last read (even if compiling them failed)
+        self._seen_signature = None
+        self.compiled = self.compile_wordlists()
+        if self.matcher.pruned:
+            logger.info(f"Profanity filter: pruned {len(self.matcher.pruned)} of {len(self.compiled.words)} words")
+        
+        # Worker processes for scan_batch, started on first use
+        self._batch_pool = None
+        self._batch_pool_size = 0
+        
+        # Words each guild added or removed on top of the shared lists
+        self.guild_wordlists = GuildWordlists(self.compiled.words, guild_wordlists_path,
+                                              covers=dict(self.pruning_report()))
+    
+    @property
+    def profanity_words(self):
+        """Base list of profanity words"""
+        return self.compiled.profanity_words
+    
+    @property
+    def harassment_words(self):
+        """Additional keywords related to harassment"""
+        return self.compiled.harassment_words
     
-    def contains_profanity(self, text):
+    @property
+    def matcher(self):
+        return self.compiled.matcher
+    
+    @property
+    def patterns(self):
+        return self.compiled.patterns
+    
+    def compile_regex_patterns(self):
+        """Compile regex patterns for each word to catch bypass attempts"""
+        self.compiled.compile_regex_patterns()
+    
+    def wordlist_paths(self):
+        """Paths of the profanity and harassment wordlist files"""
+        return (
+            os.path.join(self.wordlist_dir, PROFANITY_FILE),
+            os.path.join(self.wordlist_dir, HARASSMENT_FILE),
+        )
+    
+    def _wordlist_signature(self):
+        signature = []
+        for path in self.wordlist_paths():
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+    
+    def wordlists_changed(self):
+        """Check if the wordlist files changed since compile_wordlists() last read them"""
+        try:
+            return self._wordlist_signature() != self._seen_signature
+        except OSError:
+            # A file is being replaced right now; look again next time
+            return False
+    
+    def compile_wordlists(self):
+        """
+        Read the wordlist files and compile them into a new CompiledWordlists.
+        Doesn't touch the version in use, so it's safe to run in another thread.
+        The version number is given out by swap_wordlists(), so two compiles that
+        overlap (a file watcher reload and a !filterreload) never share one.
+        Raises OSError if a file can't be read and ValueError if the lists are empty.
+        """
+        # Look at the files before reading them, so a change made while reading is seen next time
+        signature = self._wordlist_signature()
+        self._seen_signature = signature
+        profanity_path, harassment_path = self.wordlist_paths()
+        profanity_words = load_wordlist(profanity_path)
+        harassment_words = load_wordlist(harassment_path)
+        if not profanity_words and not harassment_words:
+            raise ValueError("The wordlist files are empty")
+        
+        return CompiledWordlists(
+            profanity_words, harassment_words, self.engine, self.cache_dir,
+            self.prune, signature=signature
+        )
+    
+    def swap_wordlists(self, compiled):
+        """Start using a version compiled by compile_wordlists()"""
+        # Numbered here rather than when compiling started, so verdicts cached for
+        # another compile of the same number can't be served for this one
+        compiled.version = self.compiled.version + 1
+        self.compiled = compiled
+        self.guild_wordlists.set_global_words(compiled.words, dict(self.pruning_report()))
+        logger.info(
+            f"Profanity filter: now on wordlist version {compiled.version} "
+            f"({len(compiled.words)} words, compiled in {compiled.compile_time * 1000:.0f} ms)"
+        )
+    
+    def reload_wordlists(self):
+        """Compile the wordlist files and start using them right away"""
+        compiled = self.compile_wordlists()
+        self.swap_wordlists(compiled)
+        return compiled
+    
+    def _use_regex(self, text):
+        """Check if a text should go through the regex patterns"""
+        return self.engine == "regex" and len(str(text)) <= self.regex_length_limit
+    
+    def scan_batch(self, texts, guild_id=None, processes=0, chunk_size=BATCH_CHUNK_SIZE):
+        """
+        Check many texts, yielding contains_profanity results in the same order.
+        
+        Results stream out as they are ready, so texts can come from a generator
+        that is still being filled. With processes > 0 the texts are checked in
+        chunks by a pool of that many worker processes (kept for later calls;
+        see close_batch_pool). Only a few chunks per worker are in flight at a time.
+        Programs that use threads should start the pool first with start_batch_pool.
+        """
+        if processes <= 0:
+            for text in texts:
+                yield self.contains_profanity(text, guild_id)
+            return
+        
+        self.start_batch_pool(processes)
+        
+        # The wordlist digest makes workers reload after the lists change
+        settings = (
+            self.engine, self.regex_length_limit, self.cache_dir, self.wordlist_dir,
+            self.compiled.digest, (), ()
+        )
+        if guild_id is not None:
+            settings = settings[:5] + (
+                tuple(self.guild_wordlists.added_words(guild_id)),
+                tuple(self.guild_wordlists.removed_words(guild_id)),
+            )
+        
+        texts = iter(texts)
+        pending = deque()
+        while True:
+            while len(pending) < processes * 2:
+                chunk = [str(text) if text else "" for text in islice(texts, chunk_size)]
+                if not chunk:
+                    break
+                pending.append(self._batch_pool.submit(_scan_chunk, settings, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+    
+    def start_batch_pool(self, processes):
+        """
+        Start the worker processes scan_batch uses (if a pool of that size isn't running).
+        
+        The workers are forked, all of them right here, and forking a process that
+        runs other threads can deadlock the children (on a lock another thread held
+        at the fork). So call this from the main thread before starting any others;
+        spawned workers would be safe anywhere, but they re-run the main script.
+        """
+        if self._batch_pool is not None and self._batch_pool_size == processes:
+            return
+        self.close_batch_pool()
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        self._batch_pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+        self._batch_pool_size = processes
+        # A fork pool starts every worker on its first job
+        self._batch_pool.submit(int).result()
+    
+    def close_batch_pool(self):
+        """Shut down the worker processes used by scan_batch"""
+        if self._batch_pool is not None:
+            self._batch_pool.shutdown(cancel_futures=True)
+            self._batch_pool = None
+            self._batch_pool_size = 0
+    
+    def save_cache(self):
+        """Save the matcher, including the states it has warmed up, to the cache"""
+        if self.cache_dir:
+            save_matcher(self.matcher, self.cache_dir)
+    
+    def normalize(self, text):
+        """
+        Normalize a message once so every check can reuse it.
+        Returns a NormalizedText that contains_profanity (and other checks) accept.
+        """
+        return self.matcher.normalize(text or "")
+    
+    def contains_profanity(self, text, guild_id=None):
         """
         Check if the text contains any profanity or harassment words.
+        Accepts a string or a NormalizedText from normalize().
+        With a guild_id, that guild's added and removed words are applied too.
         Returns True if profanity is found, False otherwise.
         """
         if not text:
             return False
         
+        if guild_id is not None:
+            guild_matcher = self.guild_wordlists.matcher(guild_id)
+            if guild_matcher is not None and guild_matcher.search(text):
+                return True
+            if self.guild_wordlists.has_removed(guild_id):
+                # Rare: only look at which words matched when the guild allows some
+                return any(
+                    not self.guild_wordlists.is_removed(guild_id, match.word)
+                    for match in self._find_shared_matches(text)
+                )
+        
+        compiled = self.compiled
+        if not self._use_regex(text):
+            return compiled.matcher.search(text)
+        
+        if isinstance(text, NormalizedText):
+            text = text.original
+        
         # Check each pattern against the text
-        for pattern in self.patterns:
+        for pattern in compiled.patterns:
             if pattern.search(text):
                 return True
         
         return False
     
-    def censor_text(self, text):
+    def find_matches(self, text, guild_id=None):
+        """
+        Find every profanity and harassment word in the text.
+        Returns a list of ProfanityMatch(start, end, word, category) sorted by position,
+        with offsets into the original text. Words on both lists count as profanity.
+        With a guild_id, words the guild removed are left out and words it added are
+        included with the category "guild".
+        """
+        if not text:
+            return []
+        
+        matches = self._find_shared_matches(text)
+        if guild_id is None:
+            return matches
+        
+        if self.guild_wordlists.has_removed(guild_id):
+            matches = [
+                match for match in matches
+                if not self.guild_wordlists.is_removed(guild_id, match.word)
+            ]
+        guild_matcher = self.guild_wordlists.matcher(guild_id)
+        if guild_matcher is not None:
+            matches.extend(
+                ProfanityMatch(start, end, guild_matcher.words[index], "guild")
+                for start, end, index in guild_matcher.find_all(text)
+            )
+            matches.sort()
+        return matches
+    
+    def _find_shared_matches(self, text):
+        """Find words from the shared lists (see find_matches)"""
+        compiled = self.compiled
+        if not self._use_regex(text):
+            found = compiled.matcher.find_all(text)
+        else:
+            if isinstance(text, NormalizedText):
+                text = text.original
+            found = []
+            for index, pattern in zip(compiled.pattern_indexes, compiled.patterns):
+                for match in pattern.finditer(text):
+                    found.append((match.start(), match.end(), index))
+            found.sort()
+        
+        return [
+            ProfanityMatch(start, end, compiled.words[index], compiled.category(index))
+            for start, end, index in found
+        ]
+    
+    def verdict_key(self, text, guild_id=None):
+        """
+        Hash a message for a VerdictCache.
+        The key is the hash of the raw content (str's keyed hash, which Python
+        caches on the string), so building it costs less than the checks it
+        skips and needs no normalizing; copies of spam are the same text anyway.
+        The wordlist version and the guild's lists are part of the key, so
+        changing them doesn't serve stale verdicts.
+        """
+        if isinstance(text, NormalizedText):
+            text = text.original
+        content = hash(text or "")
+        if guild_id is not None:
+            return (self.compiled.version, guild_id, self.guild_wordlists.generation(guild_id), content)
+        return (self.compiled.version, None, 0, content)
+    
+    def pruning_report(self):
+        """List (pruned word, word that covers it) pairs in wordlist order"""
+        compiled = self.compiled
+        words = compiled.words
+        return [(words[index], words[other]) for index, other in sorted(compiled.matcher.pruned.items())]
+    
+    def censor_text(self, text, guild_id=None):
         """
         Censor profanity in the text by replacing it with asterisks.
         Returns the censored text.
+        
+        Every match is found on the original text, overlapping matches are merged
+        and the result is built once, so the outcome doesn't depend on the order
+        of the words (replacing one pattern after another could hide a longer
+        match behind the asterisks of a shorter one).
         """
+        original = text.original if isinstance(text, NormalizedText) else text
         if not text:
-            return text
-        
-        censored_text = text
+            return original
         
-        # Replace each match with asterisks
-        for pattern in self.patterns:
-            censored_text = pattern.sub(lambda match: '*' * len(match.group(0)), censored_text)
+        spans = merge_spans((match.start, match.end) for match in self.find_matches(text, guild_id))
+        if not spans:
+            return original
         
-        return censored_text
+        pieces = []
+        position = 0
+        for start, end in spans:
+            pieces.append(original[position:start])
+            pieces.append('*' * (end - start))
+            position = end
+        pieces.append(original[position:])
+        return ''.join(pieces)
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger('protected_users')
+
+
+class ProtectedUsers:
+    """
+    The users members aren't allowed to ping, shared and per guild.
+
+    Every guild protects the shared users plus any it added itself. The
+    combined set for each guild is precomputed as a frozenset, so checking a
+    message is a set intersection with the users it pings however many users
+    are protected. Guild additions are saved as JSON so they survive restarts.
+    """
+
+    MAX_PER_GUILD = 1000
+
+    def __init__(self, global_ids=(), path=None):
+        self.path = path
+        self.global_ids = frozenset(int(user_id) for user_id in global_ids)
+        # {guild_id: set of user IDs the guild added}
+        self._added = {}
+        # {guild_id: frozenset of every user protected in the guild}
+        self._combined = {}
+        self.load()
+
+    def load(self):
+        """Load the guild additions from disk"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading protected users: {e}")
+            return
+        for guild_id, user_ids in data.items():
+            self._added[int(guild_id)] = {int(user_id) for user_id in user_ids}
+        self._combined.clear()
+
+    def save(self):
+        """Write the guild additions to disk"""
+        if not self.path:
+            return
+        data = {str(guild_id): sorted(user_ids) for guild_id, user_ids in self._added.items() if user_ids}
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving protected users: {e}")
+
+    def for_guild(self, guild_id):
+        """Return the frozenset of users protected in a guild"""
+        combined = self._combined.get(guild_id)
+        if combined is None:
+            added = self._added.get(guild_id)
+            combined = self.global_ids | added if added else self.global_ids
+            self._combined[guild_id] = combined
+        return combined
+
+    def added(self, guild_id):
+        return sorted(self._added.get(guild_id, ()))
+
+    def add(self, guild_id, user_id):
+        """Protect a user in a guild; returns False if they already were"""
+        if user_id in self.for_guild(guild_id):
+            return False
+        added = self._added.setdefault(guild_id, set())
+        if len(added) >= self.MAX_PER_GUILD:
+            raise ValueError(f"This server already protects {self.MAX_PER_GUILD} users.")
+        added.add(user_id)
+        self._combined.pop(guild_id, None)
+        self.save()
+        return True
+
+    def remove(self, guild_id, user_id):
+        """Stop protecting a user a guild added; returns False if the guild hadn't added them"""
+        added = self._added.get(guild_id)
+        if not added or user_id not in added:
+            return False
+        added.discard(user_id)
+        self._combined.pop(guild_id, None)
+        self.save()
+        return True
+
+    def pinged(self, guild_id, raw_mentions, reply_author_id=None):
+        """
+        Return a protected user pinged by a message, or None.
+        raw_mentions are the user IDs mentioned in its text; reply_author_id is
+        the author of the message it replies to, if the reply pings them.
+        """
+        protected = self.for_guild(guild_id)
+        if reply_author_id is not None and reply_author_id in protected:
+            return reply_author_id
+        if not raw_mentions or protected.isdisjoint(raw_mentions):
+            return None
+        for user_id in raw_mentions:
+            if user_id in protected:
+                return user_id
+        return None
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict, deque
+
+# Discord only bulk-deletes messages younger than 14 days (with a minute to spare)
+BULK_DELETE_MAX_AGE = 14 * 86400 - 60
+
+
+class RecentMessages:
+    """
+    The last few messages of each channel, so spam can be cleaned up without fetching history.
+
+    Each channel keeps a ring buffer of (message_id, author_id, timestamp)
+    for its last per_channel messages. A guild keeps buffers for at most
+    max_channels channels; when another channel becomes active the one that
+    has been quiet the longest is dropped, so memory is capped at
+    per_channel * max_channels entries per guild.
+    """
+
+    PER_CHANNEL = 50
+    MAX_CHANNELS = 100
+
+    def __init__(self, per_channel=PER_CHANNEL, max_channels=MAX_CHANNELS):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        # {guild_id: OrderedDict of channel_id -> deque of entries, least recently active first}
+        self._guilds = {}
+        self.recorded = 0
+        self.channel_evictions = 0
+
+    def record(self, message):
+        """Remember a message (call from on_message)"""
+        channel_id = message.channel.id
+        channels = self._guilds.get(message.guild.id)
+        if channels is None:
+            channels = self._guilds[message.guild.id] = OrderedDict()
+        entries = channels.get(channel_id)
+        if entries is None:
+            entries = channels[channel_id] = deque(maxlen=self.per_channel)
+            if len(channels) > self.max_channels:
+                channels.popitem(last=False)
+                self.channel_evictions += 1
+        else:
+            channels.move_to_end(channel_id)
+        created_at = message.created_at.timestamp() if message.created_at else time.time()
+        entries.append((message.id, message.author.id, created_at))
+        self.recorded += 1
+
+    def _entries(self, guild_id, channel_id):
+        channels = self._guilds.get(guild_id)
+        return channels.get(channel_id) if channels else None
+
+    def recent_by(self, guild_id, channel_id, author_id, limit=10, max_age=None):
+        """Return the IDs of an author's latest messages in a channel, newest first"""
+        entries = self._entries(guild_id, channel_id)
+        if not entries:
+            return []
+        oldest = time.time() - max_age if max_age is not None else None
+        message_ids = []
+        for message_id, entry_author_id, created_at in reversed(entries):
+            if oldest is not None and created_at < oldest:
+                break
+            if entry_author_id == author_id:
+                message_ids.append(message_id)
+                if len(message_ids) >= limit:
+                    break
+        return message_ids
+
+    def discard(self, guild_id, channel_id, message_ids):
+        """Forget deleted messages"""
+        entries = self._entries(guild_id, channel_id)
+        if not entries:
+            return
+        message_ids = set(message_ids)
+        kept = [entry for entry in entries if entry[0] not in message_ids]
+        if len(kept) != len(entries):
+            entries.clear()
+            entries.extend(kept)
+
+    def remove_channel(self, guild_id, channel_id):
+        channels = self._guilds.get(guild_id)
+        if channels:
+            channels.pop(channel_id, None)
+
+    def remove_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def __len__(self):
+        return sum(len(entries) for channels in self._guilds.values() for entries in channels.values())
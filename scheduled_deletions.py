@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+logger = logging.getLogger('scheduled_deletions')
+
+
+class DeletionScheduler:
+    """
+    Deletes messages at a later time from one background task.
+
+    Handlers call schedule(message, delay) and return right away instead of
+    sleeping until the message should go. Jobs wait in a heap ordered by due
+    time; the task sleeps until the earliest one, then takes everything due
+    within the next batch_window seconds, groups it by channel and deletes each
+    group with one bulk delete (up to 100 messages younger than 14 days, which
+    is what Discord allows) and the rest one at a time. If bulk deletes aren't
+    permitted in a channel, its messages are deleted one at a time.
+    """
+
+    BATCH_WINDOW = 1.0  # Seconds a job may be deleted early so it can share a bulk delete
+    BULK_LIMIT = 100
+    BULK_MAX_AGE = timedelta(days=14)
+
+    def __init__(self, batch_window=BATCH_WINDOW):
+        self.batch_window = batch_window
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self.scheduled = 0
+        self.deleted = 0
+        self.bulk_deletes = 0
+        self.single_deletes = 0
+        self.failed = 0
+
+    def schedule(self, message, delay):
+        """Delete a message after delay seconds"""
+        if message is None:
+            return
+        due = time.monotonic() + delay
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, next(self._counter), message))
+        self.scheduled += 1
+        self._ensure_task()
+        if earliest is None or due < earliest:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # Wake early if a job due sooner is added
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            cutoff = time.monotonic() + self.batch_window
+            by_channel = {}
+            while self._heap and self._heap[0][0] <= cutoff:
+                _, _, message = heapq.heappop(self._heap)
+                by_channel.setdefault(message.channel.id, []).append(message)
+            for messages in by_channel.values():
+                try:
+                    await self._delete(messages)
+                except Exception as e:
+                    self.failed += len(messages)
+                    logger.error(f"Error deleting scheduled messages: {e}")
+
+    async def _delete(self, messages):
+        channel = messages[0].channel
+        bulk_cutoff = datetime.now(timezone.utc) - self.BULK_MAX_AGE + timedelta(minutes=1)
+        recent = [message for message in messages if message.created_at > bulk_cutoff]
+        singles = [message for message in messages if message.created_at <= bulk_cutoff]
+
+        if len(recent) > 1 and hasattr(channel, "delete_messages"):
+            for start in range(0, len(recent), self.BULK_LIMIT):
+                chunk = recent[start:start + self.BULK_LIMIT]
+                if len(chunk) == 1:
+                    singles.extend(chunk)
+                    continue
+                try:
+                    await channel.delete_messages(chunk)
+                    self.bulk_deletes += 1
+                    self.deleted += len(chunk)
+                except discord.Forbidden:
+                    # Bulk deletes need Manage Messages, even for the bot's own messages
+                    singles.extend(chunk)
+                except discord.NotFound:
+                    # One of them is already gone; try the others one by one
+                    singles.extend(chunk)
+        else:
+            singles.extend(recent)
+
+        for message in singles:
+            try:
+                await message.delete()
+                self.single_deletes += 1
+                self.deleted += 1
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.error(f"Error deleting scheduled message: {e}")
+
+    def stop(self):
+        """Stop the task; messages still waiting stay where they are"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
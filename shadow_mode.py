@@ -0,0 +1,199 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('shadow_mode')
+
+
+def percentile(samples, fraction):
+    """Return the value below which the given fraction of sorted samples fall"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(fraction * len(samples)))
+    return samples[index]
+
+
+class ShadowEvaluator:
+    """
+    Runs a candidate filter engine next to the current one on a sample of messages.
+
+    Sampled messages are queued and checked by both engines on a background
+    thread, so on_message only pays for a random number and a queue put. Each
+    engine is built on that thread and only used there, and both check the
+    shared wordlists (per-guild words aren't applied). Disagreements go to a
+    JSON lines file as they happen, together with a latency summary every
+    stats_interval comparisons. When the queue is full, new samples are dropped
+    and counted instead of waiting.
+    """
+
+    QUEUE_SIZE = 1000
+    LATENCY_SAMPLES = 10000  # Latencies kept per engine for the percentiles
+    STATS_INTERVAL = 500
+    RECENT_DISAGREEMENTS = 5
+    RELOAD_CHECK_INTERVAL = 100  # Comparisons between wordlist file checks
+    TEXT_LIMIT = 200  # Characters of a message written to the log
+
+    def __init__(self, primary_factory, candidate_factory, sample_rate=0.05,
+                 log_path="shadow_mode.jsonl", queue_size=QUEUE_SIZE, stats_interval=STATS_INTERVAL):
+        self.primary_factory = primary_factory
+        self.candidate_factory = candidate_factory
+        self.sample_rate = sample_rate
+        self.log_path = log_path
+        self.stats_interval = stats_interval
+        self.candidate_name = None
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._latencies = {
+            "primary": deque(maxlen=self.LATENCY_SAMPLES),
+            "candidate": deque(maxlen=self.LATENCY_SAMPLES),
+        }
+        self._recent = deque(maxlen=self.RECENT_DISAGREEMENTS)
+        self.sampled = 0
+        self.dropped = 0
+        self.compared = 0
+        self.errors = 0
+        # How many times only one of the engines flagged a message
+        self.primary_only = 0
+        self.candidate_only = 0
+        self._thread = None
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shadow-mode", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the messages already queued"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def observe(self, text, guild_id=None):
+        """Maybe queue a message for both engines (call from on_message)"""
+        if not self.running or not text or random.random() >= self.sample_rate:
+            return
+        self.sampled += 1
+        try:
+            self._queue.put_nowait((text, guild_id))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            primary = self.primary_factory()
+            candidate = self.candidate_factory()
+        except Exception as e:
+            logger.error(f"Shadow mode could not build the engines: {e}")
+            self._thread = None
+            return
+        self.candidate_name = getattr(candidate, "engine", type(candidate).__name__)
+        logger.info(f"Shadow mode: comparing {self.candidate_name} on {self.sample_rate:.1%} of messages")
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            text, guild_id = item
+            try:
+                self._compare(primary, candidate, text, guild_id)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in shadow mode comparison: {e}")
+
+            if self.compared % self.RELOAD_CHECK_INTERVAL == 0:
+                # Follow wordlist file changes like the live filter does
+                for engine in (primary, candidate):
+                    reload_wordlists = getattr(engine, "reload_wordlists", None)
+                    if reload_wordlists and engine.wordlists_changed():
+                        try:
+                            reload_wordlists()
+                        except (OSError, ValueError) as e:
+                            logger.error(f"Shadow mode could not reload wordlists: {e}")
+
+    def _compare(self, primary, candidate, text, guild_id):
+        start = time.perf_counter()
+        expected = primary.contains_profanity(text)
+        primary_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        actual = candidate.contains_profanity(text)
+        candidate_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.compared += 1
+            self._latencies["primary"].append(primary_ms)
+            self._latencies["candidate"].append(candidate_ms)
+
+        if expected != actual:
+            if expected:
+                self.primary_only += 1
+            else:
+                self.candidate_only += 1
+            record = {
+                "type": "disagreement",
+                "time": time.time(),
+                "guild_id": guild_id,
+                "text": text[:self.TEXT_LIMIT],
+                "primary": expected,
+                "candidate": actual,
+                "primary_ms": round(primary_ms, 3),
+                "candidate_ms": round(candidate_ms, 3),
+            }
+            self._recent.append(record)
+            self._write(record)
+
+        if self.compared % self.stats_interval == 0:
+            self._write(dict(self.summary(), type="stats", time=time.time()))
+
+    def _write(self, record):
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Error writing shadow mode log: {e}")
+
+    def latency_percentiles(self, engine):
+        """Return {p50, p90, p99, max} in milliseconds for "primary" or "candidate" """
+        with self._lock:
+            samples = sorted(self._latencies[engine])
+        return {
+            "p50": percentile(samples, 0.50),
+            "p90": percentile(samples, 0.90),
+            "p99": percentile(samples, 0.99),
+            "max": samples[-1] if samples else 0.0,
+        }
+
+    def summary(self):
+        """Counts and latency percentiles so far"""
+        disagreements = self.primary_only + self.candidate_only
+        return {
+            "candidate": self.candidate_name,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "compared": self.compared,
+            "errors": self.errors,
+            "disagreements": disagreements,
+            "disagreement_rate": disagreements / self.compared if self.compared else 0.0,
+            "primary_only": self.primary_only,
+            "candidate_only": self.candidate_only,
+            "latency_ms": {
+                "primary": self.latency_percentiles("primary"),
+                "candidate": self.latency_percentiles("candidate"),
+            },
+        }
+
+    def recent_disagreements(self):
+        """The last few disagreements, oldest first"""
+        return list(self._recent)
@@ -0,0 +1,236 @@
+"""
+Lexical toxicity scorer used as an optional second stage after the wordlists.
+
+The wordlists only catch the words on them; this scores the whole message with
+a logistic regression over hashed character n-grams, so paraphrases and new
+spellings of harassment still get a score. The model is trained offline from a
+labelled corpus file and saved as a .npz file:
+
+    python toxicity_scorer.py train corpus.tsv toxicity_model.npz [epochs]
+    python toxicity_scorer.py score toxicity_model.npz "some message"
+
+Each corpus line is a label (1/toxic or 0/clean), a tab and the message; blank
+lines and lines starting with # are skipped. Messages are folded the same way
+as for the keyword checks (lowercase, lookalikes replaced) before hashing.
+
+Scoring needs numpy, which is optional: without it load_toxicity_scorer
+returns None and the bot only uses the wordlists.
+"""
+import logging
+import os
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from profanity_filter import fold_text
+
+logger = logging.getLogger('toxicity_scorer')
+
+MODEL_FORMAT = 1
+
+# Constants for the n-gram hash (32 bit, wrapping)
+HASH_PRIME = 16777619
+HASH_MIX = 0x9E3779B1
+
+
+class ToxicityScorer:
+    """
+    Scores messages between 0 (clean) and 1 (toxic).
+
+    Every character n-gram of the folded message (with a space added at both
+    ends so word starts and ends are features too) is hashed into one of
+    2**bits weights. A message's score is the sigmoid of the bias plus the sum
+    of its n-gram weights divided by the square root of its n-gram count.
+    score_batch hashes all n-grams of a batch in a few numpy array operations,
+    so the Python work per message is just folding the text.
+    """
+
+    BITS = 18
+    NGRAM_RANGE = (2, 4)
+    MAX_CHARS = 1000  # Only the start of longer messages is scored (the wordlists still check all of it)
+
+    def __init__(self, weights=None, bias=0.0, bits=BITS, ngram_range=NGRAM_RANGE):
+        if np is None:
+            raise ImportError("The toxicity scorer needs numpy")
+        self.bits = bits
+        self.ngram_range = tuple(ngram_range)
+        if weights is None:
+            weights = np.zeros(1 << bits, dtype=np.float32)
+        if len(weights) != 1 << bits:
+            raise ValueError(f"Expected {1 << bits} weights, got {len(weights)}")
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with save()"""
+        if np is None:
+            raise ImportError("The toxicity scorer needs numpy")
+        with np.load(path) as model:
+            model_format, bits, min_n, max_n = (int(value) for value in model["config"])
+            if model_format != MODEL_FORMAT:
+                raise ValueError(f"Unsupported toxicity model format {model_format}")
+            return cls(model["weights"], float(model["bias"]), bits, (min_n, max_n))
+
+    def save(self, path):
+        """Write the model to a .npz file"""
+        config = np.array([MODEL_FORMAT, self.bits, *self.ngram_range], dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, weights=self.weights, bias=np.float64(self.bias), config=config)
+
+    def prepare(self, text):
+        """Fold a message (a str or a NormalizedText) the way the model saw it in training"""
+        folded = getattr(text, "folded", None)
+        if folded is None:
+            folded = fold_text(text[:self.MAX_CHARS])
+        return f" {folded[:self.MAX_CHARS].strip()} "
+
+    def features(self, texts):
+        """
+        Hash the n-grams of a batch of messages.
+        Returns (buckets, owners, counts): the weight index of every n-gram, the
+        index of the message it came from and the number of n-grams per message.
+        """
+        prepared = [self.prepare(text) for text in texts]
+        lengths = np.fromiter((len(text) for text in prepared), dtype=np.int64, count=len(prepared))
+        codes = np.frombuffer("".join(prepared).encode("utf-32-le"), dtype=np.uint32)
+        owners = np.repeat(np.arange(len(prepared)), lengths)
+
+        shift = np.uint32(32 - self.bits)
+        buckets, bucket_owners = [], []
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                break
+            hashes = np.full(count, n, dtype=np.uint32)
+            for offset in range(n):
+                hashes *= np.uint32(HASH_PRIME)
+                hashes += codes[offset:offset + count]
+            # Drop n-grams that run from one message into the next
+            inside = owners[:count] == owners[n - 1:n - 1 + count]
+            buckets.append((hashes[inside] * np.uint32(HASH_MIX)) >> shift)
+            bucket_owners.append(owners[:count][inside])
+
+        if not buckets:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(len(prepared))
+        buckets = np.concatenate(buckets).astype(np.int64)
+        bucket_owners = np.concatenate(bucket_owners)
+        return buckets, bucket_owners, np.bincount(bucket_owners, minlength=len(prepared))
+
+    def _logits(self, buckets, owners, counts):
+        sums = np.bincount(owners, weights=self.weights[buckets], minlength=len(counts))
+        return self.bias + sums / np.sqrt(np.maximum(counts, 1))
+
+    def score_batch(self, texts):
+        """Return a numpy array with the score of every message"""
+        if not texts:
+            return np.zeros(0)
+        return 1.0 / (1.0 + np.exp(-self._logits(*self.features(texts))))
+
+    def score(self, text):
+        """Return the score of one message"""
+        return float(self.score_batch([text])[0])
+
+    @classmethod
+    def train(cls, texts, labels, epochs=100, learning_rate=0.5, l2=1e-6, bits=BITS, ngram_range=NGRAM_RANGE):
+        """
+        Fit a model with full-batch gradient descent (AdaGrad step sizes) on the log loss.
+        Both classes count equally however unbalanced the corpus is.
+        """
+        scorer = cls(bits=bits, ngram_range=ngram_range)
+        labels = np.asarray(labels, dtype=np.float64)
+        buckets, owners, counts = scorer.features(texts)
+        scale = 1.0 / np.sqrt(np.maximum(counts, 1))
+
+        positives = labels.sum()
+        negatives = len(labels) - positives
+        sample_weights = np.where(labels > 0, 0.5 / max(positives, 1), 0.5 / max(negatives, 1))
+
+        weights = np.zeros(1 << bits)
+        weight_steps = np.zeros(1 << bits)
+        bias_steps = 0.0
+        for _ in range(epochs):
+            scorer.weights = weights
+            probabilities = 1.0 / (1.0 + np.exp(-scorer._logits(buckets, owners, counts)))
+            errors = (probabilities - labels) * sample_weights
+
+            weight_gradient = np.bincount(buckets, weights=(errors * scale)[owners], minlength=1 << bits)
+            weight_gradient += l2 * weights
+            weight_steps += weight_gradient ** 2
+            weights -= learning_rate * weight_gradient / (np.sqrt(weight_steps) + 1e-12)
+
+            bias_gradient = errors.sum()
+            bias_steps += bias_gradient ** 2
+            scorer.bias -= learning_rate * bias_gradient / (bias_steps ** 0.5 + 1e-12)
+
+        scorer.weights = weights.astype(np.float32)
+        return scorer
+
+
+def load_corpus(path):
+    """Read a labelled corpus file. Returns (texts, labels)"""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, separator, text = line.partition("\t")
+            label = label.strip().lower()
+            if not separator or label not in ("0", "1", "clean", "toxic"):
+                raise ValueError(f"{path}:{line_number}: expected '<label>\\t<message>'")
+            texts.append(text)
+            labels.append(1 if label in ("1", "toxic") else 0)
+    return texts, labels
+
+
+def load_toxicity_scorer(path):
+    """Load the model at path for the bot, or return None if there is none or it can't be used"""
+    if not path:
+        return None
+    if np is None:
+        logger.warning(f"Toxicity model {path} not loaded: numpy is not installed")
+        return None
+    try:
+        scorer = ToxicityScorer.load(path)
+    except (OSError, KeyError, ValueError) as e:
+        logger.error(f"Error loading toxicity model {path}: {e}")
+        return None
+    logger.info(f"Loaded toxicity model {path} ({len(scorer.weights)} weights)")
+    return scorer
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == "train":
+        texts, labels = load_corpus(args[1])
+        epochs = int(args[3]) if len(args) > 3 else 100
+        # Hold back every tenth message to report accuracy on
+        train_texts = [text for index, text in enumerate(texts) if index % 10]
+        train_labels = [label for index, label in enumerate(labels) if index % 10]
+        held_texts, held_labels = texts[::10], labels[::10]
+
+        scorer = ToxicityScorer.train(train_texts, train_labels, epochs=epochs)
+        if held_texts:
+            predicted = scorer.score_batch(held_texts) >= 0.5
+            accuracy = float(np.mean(predicted == np.asarray(held_labels, dtype=bool)))
+            print(f"Held-out accuracy: {accuracy:.1%} on {len(held_texts)} messages")
+        # The saved model is trained on everything
+        scorer = ToxicityScorer.train(texts, labels, epochs=epochs)
+        scorer.save(args[2])
+        print(f"Trained on {len(texts)} messages ({sum(labels)} toxic), saved to {os.path.abspath(args[2])}")
+    elif len(args) >= 3 and args[0] == "score":
+        scorer = ToxicityScorer.load(args[1])
+        for text in args[2:]:
+            print(f"{scorer.score(text):.3f}  {text}")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A dict whose entries expire ttl seconds after they were last set.
+
+    Every entry lives for the same ttl, so keeping them in the order they were
+    set also keeps them in the order they expire: expired entries are always at
+    the front and are dropped from there as entries are set or read, which
+    makes every operation amortized O(1) with no sweeps over the whole cache.
+    Once max_entries is reached the entry closest to expiring is dropped.
+
+    Reading an entry doesn't extend it; set it again for that:
+
+        cooldowns = TTLCache(ttl=30, max_entries=10000)
+        if user_id in cooldowns:
+            return
+        cooldowns[user_id] = True
+    """
+
+    def __init__(self, ttl, max_entries=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        # key -> (value, expires_at), oldest first
+        self._entries = OrderedDict()
+        self.expirations = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            key, (_, expires_at) = next(iter(entries.items()))
+            if expires_at > now:
+                return
+            del entries[key]
+            self.expirations += 1
+
+    def get(self, key, default=None):
+        """Return the value for a key, or default if it's missing or expired"""
+        now = self.clock()
+        self._expire(now)
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def __getitem__(self, key):
+        now = self.clock()
+        self._expire(now)
+        return self._entries[key][0]
+
+    def __contains__(self, key):
+        self._expire(self.clock())
+        return key in self._entries
+
+    def __setitem__(self, key, value):
+        now = self.clock()
+        self._expire(now)
+        entries = self._entries
+        entries[key] = (value, now + self.ttl)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key, value):
+        self[key] = value
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def remaining(self, key):
+        """Seconds until a key expires (0 if it isn't there)"""
+        entry = self._entries.get(key)
+        return max(0.0, entry[1] - self.clock()) if entry else 0.0
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        self._expire(self.clock())
+        return len(self._entries)